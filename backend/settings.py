@@ -35,18 +35,31 @@ ALLOWED_HOSTS = [os.getenv("ALLOWED_HOST", "127.0.0.1")]
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "restaurant.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "restaurant.renderers.FastJSONRenderer",  # Same output as JSONRenderer, faster with orjson installed
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=8),
     'UPDATE_LAST_LOGIN': True,
+    'TOKEN_OBTAIN_SERIALIZER': 'restaurant.serializers.TokenObtainPairWithRoleSerializer',
 }
 
+# Seconds an authenticated user stays cached (dropped when the user is changed),
+# and whether to trust the role in the token when it is not cached (needs CACHE_URL)
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', 60))
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv('AUTH_TRUST_TOKEN_CLAIMS', 'False') == 'True'
+
+# Idempotency-Key on order submits: seconds a successful response is kept for retries
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 3600))
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -63,7 +76,13 @@ INSTALLED_APPS = [
 
 AUTH_USER_MODEL = 'restaurant.User'
 
+# MySQL builds partial indexes without their condition, which is intended
+# for the open-order index on restaurant.Order.
+SILENCED_SYSTEM_CHECKS = ['models.W037']
+
 MIDDLEWARE = [
+    'restaurant.middleware.PerformanceMiddleware',
+    'restaurant.db_router.ReplicaRoutingMiddleware',  # Only used with a replica configured
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     "corsheaders.middleware.CorsMiddleware",
@@ -74,6 +93,30 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request query count and timings on the "restaurant.performance" log: one INFO
+# line per request with PERF_LOG_LEVEL=INFO, otherwise only the warnings. A threshold
+# > 0 warns when one SQL shape repeats more than that many times (N+1).
+# PERF_SERVER_TIMING also sends them to clients in a Server-Timing header; it is off
+# unless DEBUG is on, since it tells anyone how many queries a request ran and how long they took.
+PERF_INSTRUMENTATION = os.getenv('PERF_INSTRUMENTATION', 'True') == 'True'
+PERF_N_PLUS_ONE_THRESHOLD = int(os.getenv('PERF_N_PLUS_ONE_THRESHOLD', 0))
+PERF_SERVER_TIMING = os.getenv('PERF_SERVER_TIMING', str(DEBUG)) == 'True'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'restaurant.performance': {
+            'handlers': ['console'],
+            'level': os.getenv('PERF_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -97,17 +140,113 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Seconds a connection is kept open and reused by later requests in the same
+# thread (0 opens a connection per request, None keeps it until it fails).
+# Health checks ping a reused connection first, so a connection the server
+# dropped is replaced instead of failing the request.
+CONN_MAX_AGE = None if os.getenv('DB_CONN_MAX_AGE') == 'None' else int(os.getenv('DB_CONN_MAX_AGE', 60))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.mysql'),
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
     }
 }
 
+# With SQLite (local development), tests use a file rather than the default
+# in-memory database so the threads of the concurrency tests share it, and
+# transactions take the write lock up front, waiting for it instead of failing.
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['OPTIONS'] = {'timeout': 30, 'transaction_mode': 'IMMEDIATE'}
+    DATABASES['default']['TEST'] = {'NAME': str(BASE_DIR / 'test_db.sqlite3')}
+
+# Connection pooling for ASGI deployments, where persistent connections are not
+# reused between requests (run those with DB_CONN_MAX_AGE=0). Only Django's
+# PostgreSQL backend has a pool; with MySQL, DB_POOL is ignored and the
+# restaurant.W001 check warns about it.
+DB_POOL = os.getenv('DB_POOL') == 'True'
+if DB_POOL and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['CONN_MAX_AGE'] = 0  # Pooled connections go back to the pool after each request
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+        },
+    }
+
+# Optional read replica (see restaurant/db_router.py): set DB_REPLICA_HOST, or
+# DB_REPLICA_NAME for e.g. a second SQLite file when trying it locally. Unset
+# DB_REPLICA_* values are taken from the primary. GET requests to the views in
+# DB_REPLICA_VIEWS read from it, and clients that just wrote stay on the primary
+# for DB_REPLICA_PIN_SECONDS. (The menu is not listed: it is cached, and a menu
+# rebuilt from a lagging replica would stay cached until the next change.)
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['restaurant.db_router.ReplicaRouter']
+
+DB_REPLICA_VIEWS = os.getenv(
+    'DB_REPLICA_VIEWS', 'CompletedOrdersView,SalesReportView,OrderViewSet.list'
+).split(',')
+DB_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', 5))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# A shared Redis cache (e.g. CACHE_URL=redis://127.0.0.1:6379/1) in production,
+# per-process memory otherwise.
+
+if os.getenv('CACHE_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds a serialized menu stays cached (it is also dropped whenever the menu changes)
+MENU_CACHE_TIMEOUT = int(os.getenv('MENU_CACHE_TIMEOUT', 3600))
+
+# Delta sync (/api/sync/): how far each sync looks back before the client's token
+# to catch late commits, and how long deletion tombstones are kept.
+SYNC_OVERLAP_SECONDS = int(os.getenv('SYNC_OVERLAP_SECONDS', 5))
+SYNC_TOMBSTONE_DAYS = int(os.getenv('SYNC_TOMBSTONE_DAYS', 7))
+
+# Completed orders older than this many days are moved to the archive tables
+# by `manage.py archive_orders` (run it from cron)
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 90))
+
+# Seconds before the in-memory table occupancy board (/api/occupancy/) is rebuilt
+# from the database, picking up changes made by other processes
+OCCUPANCY_MAX_AGE = int(os.getenv('OCCUPANCY_MAX_AGE', 30))
+
+# Seconds the kitchen prep summary (/api/kitchen/summary/) is cached; 0 computes it on every request
+KITCHEN_SUMMARY_CACHE_SECONDS = int(os.getenv('KITCHEN_SUMMARY_CACHE_SECONDS', 5))
+
+# Live events (/api/events/, served under ASGI): the broker class that fans events
+# out to connected streams, and the seconds between keep-alive comments.
+EVENT_BROKER = os.getenv('EVENT_BROKER', 'restaurant.events.InProcessBroker')
+EVENT_STREAM_HEARTBEAT = int(os.getenv('EVENT_STREAM_HEARTBEAT', 15))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,9 @@
+"""
+Reproducible benchmarks and load generator for the order API.
+
+    python -m benchmarks --help
+
+Runs against a local SQLite stand-in (benchmarks/settings.py) seeded with
+realistic data, drives the hot endpoints with concurrent simulated waiters
+and reports throughput, latency percentiles and queries per request.
+"""
@@ -0,0 +1,123 @@
+"""
+    python -m benchmarks [--orders N] [--waiters N] [--save FILE] [--compare FILE]
+
+Seeds the benchmark database (unless --reuse), runs the load and prints a report.
+--save writes the results as JSON; --compare checks them against a saved
+baseline and exits with status 1 on a regression.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from pathlib import Path
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--menu-items', type=int, default=300)
+    parser.add_argument('--orders', type=int, default=20000, help='historical completed orders to seed')
+    parser.add_argument('--waiters', type=int, default=8, help='concurrent simulated waiters')
+    parser.add_argument('--rounds', type=int, default=20, help='orders each waiter takes and settles')
+    parser.add_argument('--reuse', action='store_true', help='keep the already seeded database')
+    parser.add_argument('--save', type=Path, help='write results to this JSON file')
+    parser.add_argument('--compare', type=Path, help='baseline JSON file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='allowed relative slowdown before a result counts as a regression')
+    return parser.parse_args(argv)
+
+
+def prepare_database(args):
+    from restaurant.models import MenuItem, User
+    from .seed import reset_database
+
+    if not args.reuse:
+        print(f"Seeding {args.menu_items} menu items and {args.orders} orders...", flush=True)
+        reset_database(menu_items=args.menu_items, orders=args.orders, waiters=args.waiters)
+
+    manager = User.objects.get(username='bench-manager')
+    waiters = list(User.objects.filter(username__startswith='bench-waiter-').order_by('id')[:args.waiters])
+    menu_ids = list(MenuItem.objects.values_list('pk', flat=True))
+    return manager, waiters, menu_ids
+
+
+def compare(results, baseline, tolerance):
+    """Return human readable regressions of `results` against `baseline`."""
+    regressions = []
+    for scenario, base in baseline['scenarios'].items():
+        current = results['scenarios'].get(scenario)
+        if current is None:
+            regressions.append(f"{scenario}: missing from this run")
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if current[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{scenario}: {metric} {base[metric]} -> {current[metric]}")
+        if current['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{scenario}: throughput {base['throughput_rps']} -> {current['throughput_rps']} req/s")
+        if (current['queries_per_request'] or 0) > (base['queries_per_request'] or 0):
+            regressions.append(
+                f"{scenario}: queries/request {base['queries_per_request']} -> {current['queries_per_request']}"
+            )
+    return regressions
+
+
+def print_report(results):
+    header = f"{'scenario':<18}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}"
+    print(header)
+    print('-' * len(header))
+    for scenario, row in results['scenarios'].items():
+        print(f"{scenario:<18}{row['requests']:>9}{row['errors']:>8}{row['throughput_rps']:>9}"
+              f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{str(row['queries_per_request']):>9}")
+    print(f"\nTotal: {results['total_requests']} requests in {results['wall_time_s']} s "
+          f"({results['throughput_rps']} req/s)")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    import django
+    django.setup()
+    from django.conf import settings
+    from .load import run
+
+    manager, waiters, menu_ids = prepare_database(args)
+    print(f"Running {len(waiters)} waiters x {args.rounds} rounds plus one manager...", flush=True)
+    scenarios, wall_time = run(manager, waiters, menu_ids, rounds=args.rounds)
+
+    total = sum(row['requests'] for row in scenarios.values())
+    results = {
+        'meta': {
+            'orders': args.orders,
+            'menu_items': args.menu_items,
+            'waiters': len(waiters),
+            'rounds': args.rounds,
+            'database': settings.DATABASES['default']['ENGINE'],
+            'python': platform.python_version(),
+        },
+        'scenarios': scenarios,
+        'total_requests': total,
+        'wall_time_s': round(wall_time, 2),
+        'throughput_rps': round(total / wall_time, 1),
+    }
+    print_report(results)
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2))
+        print(f"Saved results to {args.save}")
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
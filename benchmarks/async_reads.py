@@ -0,0 +1,117 @@
+"""
+    python -m benchmarks.async_reads [--clients N] [--requests N] [--reuse]
+
+Drives the ASGI application in-process with --clients concurrent clients, each
+sending --requests requests, and compares each sync read endpoint with its
+native async version under /api/async/ (restaurant.async_views). Reports
+throughput and latency percentiles; no network or server is involved.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+ENDPOINTS = {
+    'menu': ('/api/menu-items/', '/api/async/menu-items/'),
+    'orders (table)': ('/api/orders/?table=1&status=all', '/api/async/orders/?table=1&status=all'),
+    'users/me': ('/api/users/me/', '/api/async/users/me/'),
+}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.async_reads', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=50, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=20, help='requests per client and endpoint')
+    parser.add_argument('--orders', type=int, default=2000, help='orders to seed')
+    parser.add_argument('--reuse', action='store_true', help='keep the already seeded database')
+    return parser.parse_args(argv)
+
+
+async def request(application, path, headers):
+    """Send one GET through the ASGI application and return its status code."""
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+        'query_string': query.encode(), 'headers': headers,
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 50000),
+    }
+    disconnected = asyncio.Event()  # Never set: the client stays connected
+    sent_body = False
+    status = None
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await application(scope, receive, send)
+    return status
+
+
+async def load(application, path, headers, clients, requests):
+    latencies = []
+
+    async def client():
+        for _ in range(requests):
+            start = time.perf_counter()
+            status = await request(application, path, headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                raise RuntimeError(f"{path} returned {status}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies, time.perf_counter() - start
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    import django
+    django.setup()
+    from asgiref.sync import async_to_sync
+    from django.core.handlers.asgi import ASGIHandler
+    from django.db import connections
+    from rest_framework_simplejwt.tokens import AccessToken
+    from restaurant.models import User
+    from .load import percentile
+    from .seed import reset_database
+
+    if not args.reuse:
+        print(f"Seeding {args.orders} orders...", flush=True)
+        reset_database(orders=args.orders)
+    token = AccessToken.for_user(User.objects.get(username='bench-waiter-0'))
+    connections.close_all()
+
+    application = ASGIHandler()
+    headers = [(b'authorization', f'Bearer {token}'.encode())]
+
+    print(f"{args.clients} concurrent clients x {args.requests} requests per endpoint\n")
+    header = f"{'endpoint':<16}{'view':<7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    print(header)
+    print('-' * len(header))
+    for name, paths in ENDPOINTS.items():
+        for kind, path in zip(('sync', 'async'), paths):
+            async_to_sync(load)(application, path, headers, 2, 2)  # Warm up caches
+            latencies, wall_time = async_to_sync(load)(application, path, headers, args.clients, args.requests)
+            print(f"{name:<16}{kind:<7}{len(latencies) / wall_time:>9.1f}{statistics.median(latencies):>9.2f}"
+                  f"{percentile(latencies, 95):>9.2f}{percentile(latencies, 99):>9.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
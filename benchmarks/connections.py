@@ -0,0 +1,150 @@
+"""
+    python -m benchmarks.connections [--requests N] [--threads N] [--connect-ms MS] [--reuse]
+
+Times authenticated requests through the real WSGI handler, so connections are
+opened and closed as they would be behind a server, in each connection mode:
+a connection per request (DB_CONN_MAX_AGE=0), persistent connections, persistent
+connections with health checks and, on PostgreSQL, Django's connection pool.
+
+A local SQLite file connects almost for free, so with the default database
+--connect-ms and --ping-ms are added to every new connection and health check,
+standing in for the network, TLS and authentication round trips of a MySQL
+server. Use 0 for both with BENCH_DATABASE=default.
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+MODES = {
+    'per request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': False},
+    'persistent + checks': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+    'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'OPTIONS': {'pool': True}},
+}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.connections', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300, help='requests per thread and mode')
+    parser.add_argument('--threads', type=int, default=4, help='concurrent clients')
+    parser.add_argument('--path', default='/api/orders/?table=1&status=all', help='endpoint to request')
+    parser.add_argument('--connect-ms', type=float, default=5.0, help='simulated cost of opening a connection')
+    parser.add_argument('--ping-ms', type=float, default=0.3, help='simulated cost of a health check')
+    parser.add_argument('--orders', type=int, default=2000, help='orders to seed')
+    parser.add_argument('--reuse', action='store_true', help='keep the already seeded database')
+    return parser.parse_args(argv)
+
+
+class ConnectionCounter:
+    """Counts new connections on the default database, and slows down connecting and health checks."""
+
+    def __init__(self, wrapper_class, connect_ms, ping_ms):
+        self.opened = 0
+        self.lock = threading.Lock()
+        connect, is_usable = wrapper_class.get_new_connection, wrapper_class.is_usable
+        counter = self
+
+        def get_new_connection(self, conn_params):
+            time.sleep(connect_ms / 1000)
+            with counter.lock:
+                counter.opened += 1
+            return connect(self, conn_params)
+
+        def usable(self):
+            time.sleep(ping_ms / 1000)
+            return is_usable(self)
+
+        wrapper_class.get_new_connection = get_new_connection
+        wrapper_class.is_usable = usable
+
+
+def client(handler, environ, requests, latencies):
+    """Send `requests` sequential requests; `environ` builds a fresh WSGI environ for each."""
+    from django.db import connections
+
+    def start_response(status, headers):
+        if not status.startswith('200'):
+            raise RuntimeError(f"Request failed with {status}")
+
+    try:
+        for _ in range(requests):
+            request_environ = environ()
+            start = time.perf_counter()
+            response = handler(request_environ, start_response)
+            b''.join(response)
+            response.close()  # request_finished: closes connections past their max age
+            latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        connections.close_all()
+
+
+def run_mode(handler, environ, args):
+    latencies = []
+    threads = [threading.Thread(target=client, args=(handler, environ, args.requests, latencies))
+               for _ in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, time.perf_counter() - start
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    import django
+    django.setup()
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+    from django.test import RequestFactory
+    from rest_framework_simplejwt.tokens import AccessToken
+    from restaurant.models import User
+    from .load import percentile
+    from .seed import reset_database
+
+    if not args.reuse:
+        print(f"Seeding {args.orders} orders...", flush=True)
+        reset_database(orders=args.orders, waiters=args.threads)
+    token = AccessToken.for_user(User.objects.get(username='bench-manager'))
+    connections.close_all()
+
+    settings_dict = connections.settings['default']  # Shared by every thread's connection
+    counter = ConnectionCounter(type(connections['default']), args.connect_ms, args.ping_ms)
+    handler = WSGIHandler()
+    factory = RequestFactory()
+
+    def environ():
+        return factory.get(args.path, HTTP_AUTHORIZATION=f'Bearer {token}').environ
+
+    print(f"{args.threads} threads x {args.requests} requests to {args.path}, "
+          f"{settings_dict['ENGINE']}, connect {args.connect_ms} ms, ping {args.ping_ms} ms\n")
+    header = f"{'mode':<22}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'connections':>13}"
+    print(header)
+    print('-' * len(header))
+    original = {key: settings_dict.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'OPTIONS')}
+    for name, mode in MODES.items():
+        if 'OPTIONS' in mode and settings_dict['ENGINE'] != 'django.db.backends.postgresql':
+            print(f"{name:<22}skipped: only the PostgreSQL backend pools connections")
+            continue
+        settings_dict.update(mode, OPTIONS={**(original['OPTIONS'] or {}), **mode.get('OPTIONS', {})})
+        counter.opened = 0
+        client(handler, environ, 5, [])  # Warm up
+        counter.opened = 0
+        latencies, wall_time = run_mode(handler, environ, args)
+        print(f"{name:<22}{len(latencies) / wall_time:>9.1f}{statistics.median(latencies):>9.2f}"
+              f"{percentile(latencies, 95):>9.2f}{percentile(latencies, 99):>9.2f}{counter.opened:>13}")
+        settings_dict.update(original)
+        if hasattr(connections['default'], 'close_pool'):
+            connections['default'].close_pool()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Concurrent load generator: simulated waiters and a manager driving the API
+in-process through DRF's test client, and the statistics computed from it.
+"""
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from django.db import connection
+from rest_framework.test import APIClient
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class Recorder:
+    """Collects (latency, queries, ok) samples per scenario from many threads."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def call(self, scenario, method, *args, **kwargs):
+        start = time.perf_counter()
+        response = method(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        match = SERVER_TIMING_QUERIES.search(response.get('Server-Timing', ''))
+        with self.lock:
+            self.samples[scenario].append((elapsed, int(match.group(1)) if match else None, response.status_code < 400))
+        return response
+
+    def summary(self, wall_time):
+        report = {}
+        for scenario, samples in sorted(self.samples.items()):
+            latencies = [s[0] * 1000 for s in samples]
+            queries = [s[1] for s in samples if s[1] is not None]
+            report[scenario] = {
+                'requests': len(samples),
+                'errors': sum(1 for s in samples if not s[2]),
+                'throughput_rps': round(len(samples) / wall_time, 1),
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p95_ms': round(percentile(latencies, 95), 2),
+                'p99_ms': round(percentile(latencies, 99), 2),
+                'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+            }
+        return report
+
+
+def waiter(recorder, user, menu_ids, tables, rounds, rng):
+    """Take an order, amend it, check the menu and settle the bill — `rounds` times."""
+    client = APIClient()
+    client.force_authenticate(user)
+    try:
+        for n in range(rounds):
+            table = tables[n % len(tables)]
+            items = [{'menu_item': pk, 'quantity': rng.randrange(1, 4)} for pk in rng.sample(menu_ids, rng.randrange(3, 9))]
+            response = recorder.call('submit_order', client.post, '/api/orders/submit/',
+                                     {'table_number': table, 'items': items}, format='json')
+            # The table orders another round of drinks
+            items[0]['quantity'] += 1
+            items.append({'menu_item': rng.choice(menu_ids), 'quantity': 1})
+            recorder.call('submit_order', client.post, '/api/orders/submit/',
+                          {'table_number': table, 'items': items}, format='json')
+            recorder.call('menu_list', client.get, '/api/menu-items/')
+            if response.status_code == 200:
+                recorder.call('complete_order', client.patch, f"/api/orders/{response.data['id']}/complete/")
+    finally:
+        connection.close()
+
+
+def manager(recorder, user, rounds):
+    """Page through the completed orders log."""
+    client = APIClient()
+    client.force_authenticate(user)
+    try:
+        for _ in range(rounds):
+            url = '/api/completed-orders/'
+            for _ in range(3):
+                response = recorder.call('completed_orders', client.get, url)
+                url = response.data.get('next') if response.status_code == 200 else None
+                if not url:
+                    break
+    finally:
+        connection.close()
+
+
+def run(manager_user, waiters, menu_ids, rounds=20, manager_rounds=10, seed_value=42):
+    """Run all simulated staff at once and return (summary, wall_time)."""
+    recorder = Recorder()
+    threads = [
+        threading.Thread(target=waiter, args=(
+            recorder, user, menu_ids,
+            list(range(1000 + 100 * n, 1000 + 100 * n + 10)),  # Each waiter owns ten tables
+            rounds, random.Random(seed_value + n),
+        ))
+        for n, user in enumerate(waiters)
+    ]
+    threads.append(threading.Thread(target=manager, args=(recorder, manager_user, manager_rounds)))
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - start
+    return recorder.summary(wall_time), wall_time
@@ -0,0 +1,83 @@
+"""
+Seed a benchmark database with a realistic menu, staff and order history.
+Uses a fixed random seed so every run starts from the same data.
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from django.conf import settings
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+from restaurant.models import MenuItem, Order, OrderItem, User
+
+BATCH_SIZE = 2000
+WAITER_PASSWORD = 'bench-password'
+
+
+@contextmanager
+def explicit_created_at():
+    """Let bulk_create keep the historical created_at values instead of now()."""
+    field = Order._meta.get_field('created_at')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def seed(menu_items=300, orders=20000, waiters=8, tables=40, days=365, seed_value=42):
+    """Create the menu, a manager, waiters and `orders` completed historical orders."""
+    rng = random.Random(seed_value)
+    categories = [choice for choice, _ in MenuItem.Category.choices]
+
+    with transaction.atomic():
+        manager = User.objects.create_user(username='bench-manager', password=WAITER_PASSWORD, role='manager')
+        staff = [manager] + [
+            User.objects.create_user(username=f'bench-waiter-{n}', password=WAITER_PASSWORD)
+            for n in range(waiters)
+        ]
+        menu = MenuItem.objects.bulk_create([
+            MenuItem(
+                name=f'Dish {n}',
+                price=Decimal(rng.randrange(150, 3000)) / 100,
+                availability=1_000_000,  # Benchmarks measure speed, not stock-outs
+                category=categories[n % len(categories)],
+            )
+            for n in range(menu_items)
+        ])
+
+    now = timezone.now()
+    with explicit_created_at():
+        for start in range(0, orders, BATCH_SIZE):
+            with transaction.atomic():
+                batch = Order.objects.bulk_create([
+                    Order(
+                        table_number=rng.randrange(1, tables + 1),
+                        placed_by=rng.choice(staff),
+                        status='completed',
+                        created_at=now - timedelta(seconds=rng.randrange(days * 86400)),
+                    )
+                    for _ in range(min(BATCH_SIZE, orders - start))
+                ])
+                if batch[0].pk is None:  # Backends without RETURNING (MySQL)
+                    batch = list(Order.objects.order_by('-id')[:len(batch)])
+                OrderItem.objects.bulk_create([
+                    OrderItem(order=order, menu_item=item, quantity=rng.randrange(1, 4),
+                              unit_price=item.price, menu_item_name=item.name)
+                    for order in batch
+                    for item in rng.sample(menu, rng.randrange(1, 6))
+                ], batch_size=BATCH_SIZE)
+
+    return {'manager': manager, 'waiters': staff[1:], 'menu': menu}
+
+
+def reset_database(**options):
+    """Start the benchmark database from scratch and seed() it with `options`."""
+    database = settings.DATABASES['default']
+    if database['ENGINE'].endswith('sqlite3'):
+        Path(database['NAME']).unlink(missing_ok=True)
+    call_command('migrate', verbosity=0)
+    return seed(**options)
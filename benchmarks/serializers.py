@@ -0,0 +1,83 @@
+"""
+    python -m benchmarks.serializers [--orders N] [--repeat N] [--reuse]
+
+Times building the JSON for the order list (the first --orders orders) and the
+menu: the DRF serializers with JSONRenderer against the fast path
+(restaurant.fastpath) with FastJSONRenderer. Both include their queries.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.serializers', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--menu-items', type=int, default=300)
+    parser.add_argument('--orders', type=int, default=2000, help='orders in the serialized list')
+    parser.add_argument('--repeat', type=int, default=10, help='timed runs per variant (the median is reported)')
+    parser.add_argument('--reuse', action='store_true', help='keep the already seeded database')
+    return parser.parse_args(argv)
+
+
+def median_ms(build, repeat):
+    build()  # Warm up caches and connections
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    import django
+    django.setup()
+    from rest_framework.renderers import JSONRenderer
+    from restaurant import fastpath
+    from restaurant.models import MenuItem, Order
+    from restaurant.renderers import FastJSONRenderer, orjson
+    from restaurant.serializers import MenuItemSerializer, OrderSerializer
+    from .seed import reset_database
+
+    if not args.reuse:
+        print(f"Seeding {args.menu_items} menu items and {args.orders} orders...", flush=True)
+        reset_database(menu_items=args.menu_items, orders=args.orders, waiters=2)
+
+    # The OrderViewSet queryset, cut to the first N orders
+    ids = list(Order.objects.order_by('id').values_list('id', flat=True)[:args.orders])
+    orders = Order.objects.with_totals().select_related('placed_by').prefetch_related('items').filter(pk__in=ids)
+    menu = MenuItem.objects.all()
+
+    cases = {
+        'orders': (
+            lambda: JSONRenderer().render(OrderSerializer(orders, many=True).data),
+            lambda: FastJSONRenderer().render(fastpath.orders(orders)),
+        ),
+        'menu': (
+            lambda: JSONRenderer().render(MenuItemSerializer(menu, many=True).data),
+            lambda: FastJSONRenderer().render(fastpath.menu_items(menu)),
+        ),
+    }
+
+    print(f"{len(ids)} orders, {menu.count()} menu items, orjson {'installed' if orjson else 'not installed'}\n")
+    header = f"{'list':<10}{'serializers ms':>16}{'fast path ms':>14}{'speedup':>10}"
+    print(header)
+    print('-' * len(header))
+    for name, (slow, fast) in cases.items():
+        if slow() != fast():
+            print(f"{name}: outputs differ")
+            return 1
+        slow_ms, fast_ms = median_ms(slow, args.repeat), median_ms(fast, args.repeat)
+        print(f"{name:<10}{slow_ms:>16.1f}{fast_ms:>14.1f}{slow_ms / fast_ms:>9.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
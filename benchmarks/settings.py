@@ -0,0 +1,30 @@
+"""
+Settings for benchmark runs: the project settings with a local SQLite database.
+Set BENCH_DATABASE=default to benchmark against the DB_* database instead
+(e.g. a disposable MySQL instance).
+"""
+import os
+
+os.environ.setdefault('SECRET_KEY', 'benchmark-only-secret-key-not-for-production')
+os.environ.setdefault('PERF_LOG_LEVEL', 'ERROR')
+
+from backend.settings import *  # noqa: E402,F401,F403
+from backend.settings import BASE_DIR  # noqa: E402
+
+DEBUG = False
+ALLOWED_HOSTS = ['testserver', 'localhost', '127.0.0.1']
+PERF_INSTRUMENTATION = True  # queries per request are read from the Server-Timing header
+PERF_SERVER_TIMING = True
+
+if os.getenv('BENCH_DATABASE') != 'default':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('BENCH_DB_PATH', str(BASE_DIR / 'bench.sqlite3')),
+            'OPTIONS': {
+                # Waiters write concurrently: queue on the write lock instead of failing
+                'timeout': 30,
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
@@ -0,0 +1,59 @@
+"""
+Archival of old completed orders.
+archive_orders() moves completed orders (and their lines) into ArchivedOrder and
+ArchivedOrderItem in batches, so the live order tables only hold recent history
+and the open orders looked up on every submit. Each batch is copied and deleted
+in one transaction; the deletes are plain SQL deletes, so no tombstones or
+delete signals are produced for the archived rows.
+"""
+from django.db import connection, transaction
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+BATCH_SIZE = 1000
+
+
+def _archive_batch(ids):
+    orders = Order.objects.filter(pk__in=ids).with_totals().values(
+        'id', 'table_number', 'created_at', 'placed_by_id', 'annotated_total',
+    )
+    ArchivedOrder.objects.bulk_create([
+        ArchivedOrder(
+            id=order['id'],
+            table_number=order['table_number'],
+            created_at=order['created_at'],
+            placed_by_id=order['placed_by_id'],
+            total_price=order['annotated_total'],
+        )
+        for order in orders
+    ])
+    lines = OrderItem.objects.filter(order_id__in=ids).values_list(
+        'id', 'order_id', 'menu_item_id', 'menu_item_name', 'menu_item__category', 'unit_price', 'quantity',
+    )
+    ArchivedOrderItem.objects.bulk_create([
+        ArchivedOrderItem(id=pk, order_id=order_id, menu_item_id=menu_item_id, menu_item_name=name,
+                          category=category, unit_price=unit_price, quantity=quantity)
+        for pk, order_id, menu_item_id, name, category, unit_price, quantity in lines
+    ])
+    # One DELETE per table instead of the Collector's per-object pre_delete signals and cascades
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        for model, column in ((OrderItem, OrderItem._meta.get_field('order').column), (Order, Order._meta.pk.column)):
+            cursor.execute(f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(column)} IN ({placeholders})", ids)
+
+
+def archive_orders(before, batch_size=BATCH_SIZE):
+    """Archive completed orders created before `before` (a datetime). Returns the number archived."""
+    archived = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                Order.objects.select_for_update()
+                .filter(status='completed', created_at__lt=before)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return archived
+            _archive_batch(ids)
+        archived += len(ids)
@@ -0,0 +1,113 @@
+"""
+Native async versions of the hottest read endpoints, for the ASGI server
+(backend/asgi.py), under /api/async/:
+
+    menu-items/    MenuItemViewSet.list
+    orders/        OrderViewSet.list (same filters and pagination)
+    orders/<id>/   OrderViewSet.retrieve
+    users/me/      UserViewSet.me
+
+They return the same JSON, status codes and permissions as those DRF views.
+A sync view holds a worker thread for the whole request; these run on the
+event loop and only the queries themselves go to Django's database thread, so
+cache hits (the menu, authenticated users) never leave the loop.
+"""
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound
+from rest_framework.request import Request
+from .authentication import CachedJWTAuthentication
+from .filters import order_filters
+from .models import MenuItem, Order, User
+from .pagination import CreatedAtCursorPagination
+from .renderers import FastJSONRenderer
+from .serializers import UserSerializer
+from . import fastpath, menu_cache
+
+
+def _json(data, status=200):
+    return HttpResponse(FastJSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def _error(exc):
+    """The response DRF's exception handler gives for `exc`."""
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = _json(data, status=exc.status_code)
+    if exc.status_code == 401:
+        response['WWW-Authenticate'] = CachedJWTAuthentication().authenticate_header(None)
+    return response
+
+
+async def _authenticate(request, required=True):
+    """
+    Return (user, None), or (None, error response) like DRF: a bad token is
+    always rejected, a missing one only when `required`.
+    """
+    try:
+        result = await CachedJWTAuthentication().aauthenticate(request)
+    except APIException as exc:
+        return None, _error(exc)
+    if result is None:
+        return None, (_error(NotAuthenticated()) if required else None)
+    return result[0], None
+
+
+def _orders(request, default_status=None):
+    return Order.objects.with_totals().select_related('placed_by').filter(**order_filters(request.GET, default_status))
+
+
+@require_safe
+async def menu_items(request):
+    """The menu from the cache, with the same ETag / Last-Modified handling as the sync list."""
+    _, error = await _authenticate(request, required=False)
+    if error:
+        return error
+
+    version, modified = await menu_cache.acurrent_version()
+    etag, last_modified = quote_etag(version), int(modified.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _json(await menu_cache.aget_menu(lambda: fastpath.amenu_items(MenuItem.objects.all())))
+    response.headers.setdefault('ETag', etag)
+    if not response.has_header('Last-Modified'):
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+@require_safe
+async def orders(request):
+    _, error = await _authenticate(request)
+    if error:
+        return error
+    paginator = CreatedAtCursorPagination()
+    try:
+        rows = await paginator.apaginate_queryset(_orders(request, 'in_progress'), Request(request), fastpath.aorder_rows)
+    except APIException as exc:
+        return _error(exc)
+    return _json({'next': paginator.get_next_link(), 'results': await fastpath.aserialize_orders(rows)})
+
+
+@require_safe
+async def order_detail(request, pk):
+    _, error = await _authenticate(request)
+    if error:
+        return error
+    try:
+        data = await fastpath.aorders(_orders(request).filter(pk=pk))
+    except APIException as exc:
+        return _error(exc)
+    if not data:
+        return _error(NotFound("No Order matches the given query."))
+    return _json(data[0])
+
+
+@require_safe
+async def me(request):
+    user, error = await _authenticate(request)
+    if error:
+        return error
+    if getattr(user, 'is_partial', False):
+        user = await User.objects.aget(pk=user.pk)  # Cached or built from token claims, without the profile fields
+    return _json(UserSerializer(user).data)
@@ -0,0 +1,129 @@
+"""
+JWT authentication that resolves users from the cache.
+The fields authorization needs (id, username, role, is_active, is_staff) are
+cached for AUTH_USER_CACHE_TIMEOUT seconds, so repeat requests from the same
+tablet need no query; the password hash and profile fields are not. Saving or
+deleting a user drops its entry (see signals.py). With AUTH_TRUST_TOKEN_CLAIMS
+the user is built from the token's username and role claims on a cache miss
+too, unless the user changed after those claims were issued.
+Run several processes with the shared cache (CACHE_URL): with the local memory
+cache a change only reaches the other processes when their entry expires, and
+AUTH_TRUST_TOKEN_CLAIMS is ignored (see checks.py), since the other processes
+would never learn that a user changed.
+"""
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .models import User
+
+USER_KEY = 'auth:user:{}'
+CHANGED_KEY = 'auth:changed:{}'
+
+# Fields kept in the cached user: enough for authentication and the role checks
+CACHED_FIELDS = ('username', 'role', 'is_active', 'is_staff')
+
+# Claim holding when the username and role claims were read from the database.
+# Unlike "iat" it is copied unchanged into access tokens made from a refresh token.
+CLAIMS_ISSUED_AT = 'claims_iat'
+
+
+def shared_cache():
+    """Whether the default cache is shared between processes."""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def forget_user(user_id):
+    """Drop the cached user and remember when it changed, for the trust-claims mode."""
+    cache.delete(USER_KEY.format(user_id))
+    lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+    cache.set(CHANGED_KEY.format(user_id), time.time(), lifetime.total_seconds())
+
+
+def forget_user_on_commit(user_id):
+    # After commit, so a request running meanwhile can't cache the old row again
+    transaction.on_commit(lambda: forget_user(user_id))
+
+
+def trust_claims(validated_token):
+    """Whether to build the user from the token: only a shared cache sees every user change."""
+    return settings.AUTH_TRUST_TOKEN_CLAIMS and has_claims(validated_token) and shared_cache()
+
+
+def cached_user(user):
+    """An unsaved copy of `user` with only CACHED_FIELDS, to keep in the cache."""
+    partial = User(pk=user.pk, **{name: getattr(user, name) for name in CACHED_FIELDS})
+    partial.is_partial = True
+    return partial
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        key = USER_KEY.format(user_id)
+        user = cache.get(key)
+        if user is not None:
+            return user
+        if trust_claims(validated_token):
+            user = self.user_from_claims(user_id, validated_token, cache.get(CHANGED_KEY.format(user_id)))
+            if user is not None:
+                return user
+
+        user = super().get_user(validated_token)  # Rejects missing and inactive users
+        cache.set(key, cached_user(user), settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views: (user, token), or None without a JWT."""
+        header = self.get_header(request)
+        raw_token = header and self.get_raw_token(header)
+        if not raw_token:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        """get_user() for async views, reading the cache without leaving the event loop."""
+        user_id = self.get_user_id(validated_token)
+        key = USER_KEY.format(user_id)
+        user = await cache.aget(key)
+        if user is not None:
+            return user
+        if trust_claims(validated_token):
+            user = self.user_from_claims(user_id, validated_token, await cache.aget(CHANGED_KEY.format(user_id)))
+            if user is not None:
+                return user
+
+        # Only on a cache miss: reuse simplejwt's checks for missing, inactive and revoked users
+        user = await sync_to_async(super().get_user)(validated_token)
+        await cache.aset(key, cached_user(user), settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+    def user_from_claims(self, user_id, validated_token, changed):
+        """
+        An unsaved User with the id, username and role from the token, or None
+        when the user changed (at the `changed` timestamp) after they were issued.
+        """
+        if changed is not None and changed >= validated_token[CLAIMS_ISSUED_AT]:
+            return None
+        user = User(pk=user_id, username=validated_token['username'], role=validated_token['role'])
+        user.is_partial = True
+        return user
+
+
+def has_claims(validated_token):
+    """Whether the token carries the username and role claims."""
+    return all(claim in validated_token for claim in ('username', 'role', CLAIMS_ISSUED_AT))
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+from .authentication import shared_cache
+
+
+@register()
+def connection_pool_check(app_configs, **kwargs):
+    """DB_POOL only takes effect on backends with a connection pool (PostgreSQL)."""
+    if not getattr(settings, 'DB_POOL', False):
+        return []
+    return [
+        Warning(
+            f"DB_POOL is set but the {alias!r} database ({db['ENGINE']}) has no connection pool.",
+            hint="Connections are persistent instead (DB_CONN_MAX_AGE). Under ASGI, "
+                 "pool MySQL connections with a proxy such as ProxySQL.",
+            id='restaurant.W001',
+        )
+        for alias, db in settings.DATABASES.items()
+        if not db.get('OPTIONS', {}).get('pool')
+    ]
+
+
+@register()
+def trust_token_claims_check(app_configs, **kwargs):
+    """AUTH_TRUST_TOKEN_CLAIMS needs a cache every process sees user changes in."""
+    if not getattr(settings, 'AUTH_TRUST_TOKEN_CLAIMS', False) or shared_cache():
+        return []
+    return [
+        Warning(
+            "AUTH_TRUST_TOKEN_CLAIMS is set but the default cache is not shared between processes, "
+            "so it is ignored and users are looked up in the database.",
+            hint="Set CACHE_URL to a shared cache such as Redis.",
+            id='restaurant.W002',
+        )
+    ]
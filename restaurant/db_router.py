@@ -0,0 +1,104 @@
+"""
+Optional read replica routing.
+When a "replica" database is configured (DB_REPLICA_* settings), GET and HEAD
+requests to the views named in DB_REPLICA_VIEWS read from it; everything else
+uses the primary. A request switches back to the primary as soon as it writes,
+and a client that wrote keeps reading from the primary for
+DB_REPLICA_PIN_SECONDS afterwards, so it always sees its own writes even if the
+replica lags behind.
+"""
+import hashlib
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from .middleware import view_name
+
+REPLICA = 'replica'
+PIN_KEY = 'db:pinned:{}'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_state = ContextVar('db_routing', default=None)
+
+
+class RoutingState:
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+
+
+class ReplicaRouter:
+    """Listed in DATABASE_ROUTERS when the replica is configured."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is not None and state.use_replica and not state.wrote:
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # Both databases hold the same data
+
+
+def _client_key(request):
+    """Identify the client by its credentials (JWT header or ?token=), or None if anonymous."""
+    credentials = request.META.get('HTTP_AUTHORIZATION') or request.GET.get('token')
+    return credentials and hashlib.sha256(credentials.encode()).hexdigest()
+
+
+class ReplicaRoutingMiddleware:
+    """Decides per request whether reads may use the replica (see the module docstring)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if REPLICA not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.replica_views = set(settings.DB_REPLICA_VIEWS)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState()
+        request.db_routing = state
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        client = _client_key(request)
+        if state.wrote and client:
+            cache.set(PIN_KEY.format(client), True, settings.DB_REPLICA_PIN_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        state = RoutingState()
+        request.db_routing = state
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        client = _client_key(request)
+        if state.wrote and client:
+            await cache.aset(PIN_KEY.format(client), True, settings.DB_REPLICA_PIN_SECONDS)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in SAFE_METHODS or view_name(view_func, request.method) not in self.replica_views:
+            return
+        client = _client_key(request)
+        request.db_routing.use_replica = not (client and cache.get(PIN_KEY.format(client)))
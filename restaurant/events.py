@@ -0,0 +1,106 @@
+"""
+Live order and menu events for kitchen and floor displays.
+Request code publishes events once its transaction commits, and every
+connected event stream (see restaurant.streams) receives them through the broker.
+
+The broker class is chosen with the EVENT_BROKER setting. The default
+InProcessBroker only reaches streams served by the same process. A shared
+broker (e.g. Redis pub/sub) can replace it by providing the same
+publish() / subscribe() interface.
+"""
+import asyncio
+import itertools
+import threading
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+ORDER_CREATED = 'order.created'
+ORDER_AMENDED = 'order.amended'
+ORDER_COMPLETED = 'order.completed'
+MENU_AVAILABILITY = 'menu.availability'
+
+
+class Subscription:
+    """One connected stream: an asyncio queue fed from any thread."""
+
+    def __init__(self, broker, max_queue):
+        self.broker = broker
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+    def offer(self, event):
+        """Runs on the subscriber's loop. A slow client loses its oldest events, not new ones."""
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """Wait for the next event; returns None when the timeout passes first."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fans events out to the subscriptions of this process."""
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self):
+        """Must be called from the event loop that will read the subscription."""
+        subscription = Subscription(self, self.max_queue)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        """Safe to call from any thread, no waiting on subscribers."""
+        event = {**event, 'id': next(self._ids)}
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:  # The loop is already closed
+                self.unsubscribe(subscription)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.EVENT_BROKER)()
+    return _broker
+
+
+def publish_on_commit(event_type, **data):
+    """Publish an event once the current transaction commits (never for rolled back work)."""
+    event = {'type': event_type, 'at': timezone.now().isoformat(), **data}
+    transaction.on_commit(lambda: get_broker().publish(event))
+
+
+def order_changed(event_type, order, **data):
+    publish_on_commit(event_type, order=order.pk, table_number=order.table_number, **data)
+
+
+def availability_changed(menu_item_ids):
+    publish_on_commit(MENU_AVAILABILITY, menu_items=sorted(menu_item_ids))
@@ -0,0 +1,121 @@
+"""
+Streaming export of completed orders (archived and live) for accounting.
+Orders are read in keyset batches on id (a query for a batch of orders and one
+for their lines, per table) and written straight into the response one batch
+at a time, so memory use stays the same whatever the size of the range.
+rows() is for the WSGI server; under ASGI use arows(), which runs each batch's
+queries in a thread: Django would read a sync iterator into memory first.
+"""
+import csv
+import json
+from asgiref.sync import sync_to_async
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+BATCH_SIZE = 500
+
+CSV_HEADER = [
+    'order_id', 'created_at', 'table_number', 'placed_by',
+    'menu_item_id', 'menu_item_name', 'unit_price', 'quantity', 'line_total',
+]
+
+
+def _read(orders_queryset, lines_queryset, last_id):
+    """The first BATCH_SIZE orders after `last_id` (dicts with an "items" list), in id order."""
+    orders = list(
+        orders_queryset.filter(id__gt=last_id)
+        .order_by('id')
+        .values('id', 'table_number', 'created_at', 'placed_by__username')[:BATCH_SIZE]
+    )
+    by_id = {order['id']: {**order, 'items': []} for order in orders}
+    lines = (
+        lines_queryset.filter(order_id__in=list(by_id))
+        .order_by('order_id', 'id')
+        .values_list('order_id', 'menu_item_id', 'menu_item_name', 'unit_price', 'quantity')
+    )
+    for order_id, menu_item_id, name, price, quantity in lines:
+        by_id[order_id]['items'].append({
+            'menu_item': menu_item_id,
+            'menu_item_name': name,
+            'price': price,
+            'quantity': quantity,
+        })
+    return list(by_id.values())
+
+
+def next_batch(filters, last_id):
+    """
+    The completed orders after `last_id`, archived and live together in id order
+    (an empty list once there are none left).
+    archive_orders moves an order from the live tables to the archive in one
+    transaction, possibly between these queries. The live tables are read first,
+    so an order moved meanwhile is found in the archive too and kept once from
+    there, instead of being missed or exported twice.
+    """
+    live = _read(Order.objects.filter(status='completed', **filters), OrderItem.objects.all(), last_id)
+    archived = _read(ArchivedOrder.objects.filter(**filters), ArchivedOrderItem.objects.all(), last_id)
+    # Past the end of a full batch the other table may hold orders this round has not read
+    upper = min((batch[-1]['id'] for batch in (live, archived) if len(batch) == BATCH_SIZE), default=None)
+    orders = {order['id']: order for order in live + archived if upper is None or order['id'] <= upper}
+    return [orders[pk] for pk in sorted(orders)]
+
+
+def _csv_lines(order):
+    writer = csv.writer(_Echo())
+    created_at = order['created_at'].isoformat()
+    return [
+        writer.writerow([
+            order['id'], created_at, order['table_number'], order['placed_by__username'],
+            item['menu_item'], item['menu_item_name'], f"{item['price']:.2f}", item['quantity'],
+            f"{item['price'] * item['quantity']:.2f}",
+        ])
+        for item in order['items']
+    ]
+
+
+def _ndjson_lines(order):
+    total = sum(item['price'] * item['quantity'] for item in order['items'])
+    return [json.dumps({
+        'id': order['id'],
+        'table_number': order['table_number'],
+        'placed_by': order['placed_by__username'],
+        'created_at': order['created_at'].isoformat(),
+        'total_price': f"{total:.2f}",
+        'items': [{**item, 'price': f"{item['price']:.2f}"} for item in order['items']],
+    }) + '\n']
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the csv writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+# format: (header, lines for one order, content type)
+FORMATS = {
+    'csv': (csv.writer(_Echo()).writerow(CSV_HEADER), _csv_lines, 'text/csv'),
+    'ndjson': ('', _ndjson_lines, 'application/x-ndjson'),
+}
+
+
+def rows(fmt, filters):
+    """Yield the export in format `fmt`, one chunk per batch of orders."""
+    header, lines, _ = FORMATS[fmt]
+    if header:
+        yield header
+    last_id = 0
+    while batch := next_batch(filters, last_id):
+        yield ''.join(line for order in batch for line in lines(order))
+        last_id = batch[-1]['id']
+
+
+async def arows(fmt, filters):
+    """rows() as an async iterator, for StreamingHttpResponse under ASGI."""
+    header, lines, _ = FORMATS[fmt]
+    if header:
+        yield header
+    last_id = 0
+    while batch := await sync_to_async(next_batch)(filters, last_id):
+        yield ''.join(line for order in batch for line in lines(order))
+        last_id = batch[-1]['id']
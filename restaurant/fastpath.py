@@ -0,0 +1,108 @@
+"""
+Read-only fast serialization for the order and menu lists.
+Builds the same data as OrderSerializer and MenuItemSerializer straight from
+.values() rows: no model instances and no per-field serializer calls, and an
+order list costs two queries (orders with totals, then all their lines).
+Keep the field order in step with the serializers; tests compare the output
+byte for byte.
+"""
+from rest_framework import serializers
+from .models import OrderItem
+
+MENU_FIELDS = ('id', 'name', 'price', 'availability', 'category')
+ORDER_FIELDS = ('id', 'table_number', 'placed_by__username', 'placed_by__role', 'status', 'created_at', 'annotated_total')
+ITEM_FIELDS = ('order_id', 'id', 'menu_item_id', 'menu_item_name', 'unit_price', 'quantity')
+
+# Same timezone handling and ISO 8601 format as the serializers' datetimes
+_datetime = serializers.DateTimeField().to_representation
+
+
+def _decimal(value):
+    return f"{value:.2f}"
+
+
+def _menu_item(row):
+    return {**row, 'price': _decimal(row['price'])}
+
+
+def _order_item(order_id, pk, menu_item_id, name, unit_price, quantity):
+    return {
+        'id': pk,
+        'menu_item': menu_item_id,
+        'menu_item_name': name,
+        'price': _decimal(unit_price),
+        'quantity': quantity,
+    }
+
+
+def _order(row, items):
+    return {
+        'id': row['id'],
+        'table_number': row['table_number'],
+        'placed_by': f"{row['placed_by__username']} ({row['placed_by__role']})",  # User.__str__
+        'status': row['status'],
+        'created_at': _datetime(row['created_at']),
+        'total_price': _decimal(row['annotated_total']),
+        'items': items,
+    }
+
+
+def _item_rows(order_ids):
+    return OrderItem.objects.filter(order_id__in=order_ids).order_by('id').values_list(*ITEM_FIELDS)
+
+
+def menu_items(queryset):
+    """MenuItemSerializer(queryset, many=True).data, as plain dicts."""
+    return [_menu_item(row) for row in queryset.values(*MENU_FIELDS)]
+
+
+def order_items(order_ids):
+    """OrderItemSerializer data for the given orders, as {order_id: [items]}."""
+    by_order = {pk: [] for pk in order_ids}
+    for row in _item_rows(list(by_order)):
+        by_order[row[0]].append(_order_item(*row))
+    return by_order
+
+
+def orders(queryset):
+    """
+    OrderSerializer(queryset, many=True).data, as plain dicts.
+    `queryset` must come from Order.objects.with_totals().
+    """
+    return serialize_orders(order_rows(queryset))
+
+
+def order_rows(queryset):
+    """The raw order rows, e.g. for CreatedAtCursorPagination's fetch."""
+    return list(queryset.prefetch_related(None).values(*ORDER_FIELDS))
+
+
+def serialize_orders(rows):
+    items = order_items([row['id'] for row in rows])
+    return [_order(row, items[row['id']]) for row in rows]
+
+
+# The same, reading with the async ORM (see restaurant.async_views)
+
+async def amenu_items(queryset):
+    return [_menu_item(row) async for row in queryset.values(*MENU_FIELDS)]
+
+
+async def aorder_items(order_ids):
+    by_order = {pk: [] for pk in order_ids}
+    async for row in _item_rows(list(by_order)):
+        by_order[row[0]].append(_order_item(*row))
+    return by_order
+
+
+async def aorders(queryset):
+    return await aserialize_orders(await aorder_rows(queryset))
+
+
+async def aorder_rows(queryset):
+    return [row async for row in queryset.prefetch_related(None).values(*ORDER_FIELDS)]
+
+
+async def aserialize_orders(rows):
+    items = await aorder_items([row['id'] for row in rows])
+    return [_order(row, items[row['id']]) for row in rows]
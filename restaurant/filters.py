@@ -0,0 +1,96 @@
+"""
+Query-string filters shared by the order listing endpoints.
+"""
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from .models import Order
+
+ORDER_STATUSES = [status for status, _ in Order.STATUS_CHOICES]
+
+
+def _parse_bound(value, param):
+    """
+    Parse a YYYY-MM-DD date or ISO 8601 datetime.
+    Returns (aware datetime, is_plain_date).
+    """
+    try:
+        day = parse_date(value)
+        moment = datetime.combine(day, time.min) if day else parse_datetime(value)
+    except ValueError:
+        moment = day = None
+    if moment is None:
+        raise ValidationError({param: "Use YYYY-MM-DD or an ISO 8601 datetime."})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment, day is not None
+
+
+def order_filters(params, default_status=None):
+    """
+    Build filter kwargs for the order list from its query string: ?table=3,
+    ?status=in_progress|completed|all (default: `default_status`, None meaning
+    all), ?placed_by=<user id> and ?from= / ?to= (see date_range).
+    """
+    lookups = {}
+    table = params.get('table')
+    if table:
+        if not table.isdigit():
+            raise ValidationError({'table': "Use a table number."})
+        lookups['table_number'] = int(table)
+    status = params.get('status', default_status)
+    if status and status != 'all':
+        if status not in ORDER_STATUSES:
+            raise ValidationError({'status': f"Use one of: {', '.join(ORDER_STATUSES)}, all."})
+        lookups['status'] = status
+    placed_by = params.get('placed_by')
+    if placed_by:
+        if not placed_by.isdigit():
+            raise ValidationError({'placed_by': "Use a user id."})
+        lookups['placed_by_id'] = int(placed_by)
+    lookups.update(_date_lookups(params, 'created_at'))
+    return lookups
+
+
+def date_range(request, field='created_at'):
+    """
+    Build filter kwargs for ?from= and ?to= (both inclusive, a plain date in
+    ?to= covers that whole day). The raw column is compared against datetimes
+    so an index on it can be used.
+    """
+    return _date_lookups(request.query_params, field)
+
+
+def _date_lookups(params, field):
+    lookups = {}
+    start = params.get('from')
+    end = params.get('to')
+    if start:
+        lookups[f'{field}__gte'] = _parse_bound(start, 'from')[0]
+    if end:
+        moment, is_date = _parse_bound(end, 'to')
+        if is_date:
+            lookups[f'{field}__lt'] = moment + timedelta(days=1)
+        else:
+            lookups[f'{field}__lte'] = moment
+    return lookups
+
+
+def day_range(request, default_days=30):
+    """
+    Read ?from= and ?to= as plain dates (both inclusive).
+    Without them the range is the last `default_days` days up to today.
+    """
+    today = timezone.localdate()
+    bounds = []
+    for param, default in (('from', today - timedelta(days=default_days - 1)), ('to', today)):
+        value = request.query_params.get(param)
+        try:
+            day = parse_date(value) if value else default
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValidationError({param: "Use YYYY-MM-DD."})
+        bounds.append(day)
+    return tuple(bounds)
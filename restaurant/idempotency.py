@@ -0,0 +1,75 @@
+"""
+Idempotency-Key support for POSTs that tablets retry on flaky Wi-Fi.
+The first request with a key runs the view and, if it succeeded (2xx), its
+response is kept in the cache for IDEMPOTENCY_KEY_TTL seconds; retries with the
+same key get that response back without running the view (nor touching the
+database) again. Failed requests are not kept, so a retry can succeed once stock
+is back or the conflict is resolved. A duplicate arriving while the first request
+is still running gets a 409 with Retry-After instead of holding a worker.
+Keys are scoped to the user and the URL, and reusing a key with a different
+body is rejected. Needs the shared cache (CACHE_URL) with several processes.
+"""
+import functools
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+KEY = 'idempotency:{}'
+MAX_KEY_LENGTH = 255
+LOCK_TIMEOUT = 60  # A crashed request stops blocking its key after this many seconds
+RETRY_AFTER = 1  # Seconds a duplicate of a running request is told to wait
+
+
+def _digest(value):
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def _replay(entry):
+    return Response(entry['data'], status=entry['status'], headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(view_method):
+    """Make a view method honour the Idempotency-Key header."""
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({"error": f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        cache_key = KEY.format(_digest(f"{request.user.pk}:{request.path}:{key}"))
+        fingerprint = _digest(json.dumps(request.data, sort_keys=True, default=str))
+
+        while True:
+            # Claim the key; only one request at a time can run the view for it
+            if cache.add(cache_key, {'fingerprint': fingerprint, 'status': None}, LOCK_TIMEOUT):
+                try:
+                    response = view_method(self, request, *args, **kwargs)
+                except Exception:
+                    cache.delete(cache_key)
+                    raise
+                if status.is_success(response.status_code):
+                    cache.set(cache_key, {'fingerprint': fingerprint, 'status': response.status_code,
+                                          'data': response.data}, settings.IDEMPOTENCY_KEY_TTL)
+                else:
+                    cache.delete(cache_key)  # Let the retry run again
+                return response
+
+            entry = cache.get(cache_key)
+            if entry is None:
+                continue  # The running request failed or expired meanwhile
+            if entry['fingerprint'] != fingerprint:
+                return Response({"error": "Idempotency-Key was already used with a different request."},
+                                status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if entry['status'] is not None:
+                return _replay(entry)
+            return Response({"error": "A request with this Idempotency-Key is still being processed."},
+                            status=status.HTTP_409_CONFLICT, headers={'Retry-After': str(RETRY_AFTER)})
+
+    return wrapper
@@ -0,0 +1,42 @@
+"""
+Kitchen prep summary: how many of each menu item the open orders still need,
+grouped by category, for the wall display. One GROUP BY over the lines of the
+in-progress orders, cached for KITCHEN_SUMMARY_CACHE_SECONDS so a room full of
+displays polling it costs at most one query per interval.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from .models import MenuItem, OrderItem
+
+CACHE_KEY = 'kitchen:summary'
+CATEGORY_ORDER = {category: n for n, category in enumerate(MenuItem.Category.values)}
+
+
+def summary():
+    """[{"category", "quantity", "items": [{"menu_item", "name", "quantity"}]}] in menu order."""
+    rows = (
+        OrderItem.objects.filter(order__status='in_progress')
+        .values('menu_item_id', 'menu_item__name', 'menu_item__category')
+        .annotate(quantity=Sum('quantity'))
+        .order_by('menu_item__name', 'menu_item_id')
+    )
+    categories = {}
+    for row in rows:
+        group = categories.setdefault(row['menu_item__category'], {
+            'category': row['menu_item__category'], 'quantity': 0, 'items': [],
+        })
+        group['quantity'] += row['quantity']
+        group['items'].append({'menu_item': row['menu_item_id'], 'name': row['menu_item__name'], 'quantity': row['quantity']})
+    return sorted(categories.values(), key=lambda group: CATEGORY_ORDER.get(group['category'], len(CATEGORY_ORDER)))
+
+
+def cached_summary():
+    timeout = settings.KITCHEN_SUMMARY_CACHE_SECONDS
+    if timeout <= 0:
+        return summary()
+    data = cache.get(CACHE_KEY)
+    if data is None:
+        data = summary()
+        cache.set(CACHE_KEY, data, timeout)
+    return data
@@ -0,0 +1,20 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from restaurant import archive
+
+
+class Command(BaseCommand):
+    help = "Move completed orders older than ARCHIVE_AFTER_DAYS from the live order tables into the archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.ARCHIVE_AFTER_DAYS)
+        parser.add_argument("--batch-size", type=int, default=archive.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options["days"] < 1 or options["batch_size"] < 1:
+            raise CommandError("--days and --batch-size must be positive.")
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        archived = archive.archive_orders(cutoff, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} orders older than {options['days']} days."))
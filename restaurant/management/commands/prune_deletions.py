@@ -0,0 +1,17 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from restaurant.models import Deletion
+
+
+class Command(BaseCommand):
+    help = "Delete sync tombstones older than SYNC_TOMBSTONE_DAYS (clients that far behind get a full snapshot)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.SYNC_TOMBSTONE_DAYS)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        deleted, _ = Deletion.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Removed {deleted} tombstones older than {options['days']} days."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from restaurant import reports
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily sales rollup from completed orders (optionally only for a date range)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="start", help="first day to rebuild (YYYY-MM-DD)")
+        parser.add_argument("--to", dest="end", help="last day to rebuild (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        bounds = []
+        for name in ("start", "end"):
+            value = options[name]
+            day = parse_date(value) if value else None
+            if value and day is None:
+                raise CommandError(f"Invalid date: {value}")
+            bounds.append(day)
+
+        written = reports.rebuild(*bounds)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt daily sales: {written} rows written."))
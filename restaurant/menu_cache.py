@@ -0,0 +1,87 @@
+"""
+Versioned cache of the public menu.
+The serialized menu is stored in Django's cache under the current menu version.
+Any change to menu items (including availability) bumps the version once the
+transaction commits, which both invalidates the cached menu and changes the
+ETag clients use for conditional requests.
+"""
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+VERSION_KEY = 'menu:version'
+DATA_KEY = 'menu:data:{}'
+
+
+def _new_version():
+    """
+    Last-Modified only has second precision and must not be ahead of the clock,
+    so versions started in the same second share it; their ETags still differ,
+    and If-None-Match takes precedence over If-Modified-Since.
+    """
+    return uuid.uuid4().hex, timezone.now().replace(microsecond=0)
+
+
+def current_version():
+    """Return (version, last_modified), starting a new version if the cache lost it."""
+    value = cache.get(VERSION_KEY)
+    if value is None:
+        value = _new_version()
+        if not cache.add(VERSION_KEY, value, None):
+            value = cache.get(VERSION_KEY) or value
+    return value
+
+
+async def acurrent_version():
+    """current_version() for async views."""
+    value = await cache.aget(VERSION_KEY)
+    if value is None:
+        value = _new_version()
+        if not await cache.aadd(VERSION_KEY, value, None):
+            value = await cache.aget(VERSION_KEY) or value
+    return value
+
+
+def invalidate():
+    """Start a new menu version right away."""
+    cache.set(VERSION_KEY, _new_version(), None)
+
+
+def invalidate_on_commit():
+    """
+    Start a new menu version once the current transaction commits,
+    so no request can cache data that is about to change.
+    """
+    transaction.on_commit(invalidate)
+
+
+def etag(request, *args, **kwargs):
+    return current_version()[0]
+
+
+def last_modified(request, *args, **kwargs):
+    return current_version()[1]
+
+
+def get_menu(build):
+    """Return the serialized menu for the current version, calling build() on a miss."""
+    version, _ = current_version()
+    key = DATA_KEY.format(version)
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, settings.MENU_CACHE_TIMEOUT)
+    return data
+
+
+async def aget_menu(build):
+    """get_menu() for async views; `build` is a coroutine function."""
+    version, _ = await acurrent_version()
+    key = DATA_KEY.format(version)
+    data = await cache.aget(key)
+    if data is None:
+        data = await build()
+        await cache.aset(key, data, settings.MENU_CACHE_TIMEOUT)
+    return data
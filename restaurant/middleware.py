@@ -0,0 +1,190 @@
+"""
+Per-request performance instrumentation.
+Records SQL query count, DB time, response rendering time and wall time for
+every view (serializer .data work happens inside the view, so it counts as
+"app" time) and logs them as one JSON line on the "restaurant.performance"
+logger (at INFO, so only when PERF_LOG_LEVEL=INFO). With PERF_SERVER_TIMING
+(on when DEBUG is) they are also sent back in a Server-Timing header.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger('restaurant.performance')
+
+# Collapse "IN (%s, %s, ...)" so queries differing only in list length share a shape
+IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+
+
+def sql_shape(sql):
+    return IN_LIST.sub('(...)', sql)
+
+
+def view_name(view_func, method):
+    """Readable name such as "OrderViewSet.submit_order" or "CompletedOrdersView"."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f"{view_func.__module__}.{view_func.__name__}"
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        return f"{cls.__name__}.{actions.get(method.lower(), method.lower())}"
+    return cls.__name__
+
+
+class QueryRecorder:
+    """Database execute wrapper counting and timing every query of a request."""
+
+    def __init__(self, track_shapes=False):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter() if track_shapes else None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            if self.shapes is not None:
+                self.shapes[sql_shape(sql)] += 1
+
+
+# The request being instrumented. A context variable rather than per-request
+# execute wrappers, because the async ORM runs queries on another thread whose
+# connections a middleware on the event loop cannot reach.
+_current = ContextVar('perf_stats', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats.queries(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender=None, connection=None, **kwargs):
+    """Let every connection report its queries to the request being instrumented."""
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+@contextmanager
+def recording(stats):
+    token = _current.set(stats)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+class RequestStats:
+    def __init__(self, track_shapes):
+        self.queries = QueryRecorder(track_shapes)
+        self.view = None
+        self.render = 0.0
+        self.total = 0.0
+        self.started = time.perf_counter()
+
+    def server_timing(self):
+        db = self.queries.duration * 1000
+        render = self.render * 1000
+        total = self.total * 1000
+        return ", ".join([
+            f'db;dur={db:.1f};desc="{self.queries.count} queries"',
+            f'render;dur={render:.1f}',
+            f'app;dur={max(total - db - render, 0):.1f}',
+            f'total;dur={total:.1f}',
+        ])
+
+    def as_dict(self, request, response):
+        return {
+            'view': self.view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': self.queries.count,
+            'db_ms': round(self.queries.duration * 1000, 2),
+            'render_ms': round(self.render * 1000, 2),
+            'total_ms': round(self.total * 1000, 2),
+        }
+
+
+class PerformanceMiddleware:
+    """
+    Enabled with PERF_INSTRUMENTATION. Setting PERF_N_PLUS_ONE_THRESHOLD to N > 0
+    also logs a warning when the same SQL shape runs more than N times in one request.
+    Should be listed first in MIDDLEWARE so it sees the whole request.
+    """
+
+    sync_capable = True
+    async_capable = True  # Keeps async views (restaurant.async_views) off the thread pool
+
+    def __init__(self, get_response):
+        if not settings.PERF_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = self.start(request)
+        for connection in connections.all():
+            install_query_recorder(connection=connection)
+        with recording(stats):
+            response = self.get_response(request)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = self.start(request)
+        with recording(stats):
+            response = await self.get_response(request)
+        return self.finish(request, response, stats)
+
+    def start(self, request):
+        stats = RequestStats(track_shapes=settings.PERF_N_PLUS_ONE_THRESHOLD > 0)
+        request.perf_stats = stats
+        return stats
+
+    def finish(self, request, response, stats):
+        stats.total = time.perf_counter() - stats.started
+        if request.resolver_match:  # Read here rather than in process_view, which async requests run in a thread
+            stats.view = view_name(request.resolver_match.func, request.method)
+        if settings.PERF_SERVER_TIMING:
+            response['Server-Timing'] = stats.server_timing()
+        threshold = settings.PERF_N_PLUS_ONE_THRESHOLD
+        if threshold > 0:
+            repeated = {shape: n for shape, n in stats.queries.shapes.items() if n > threshold}
+            if repeated:
+                record = stats.as_dict(request, response)
+                record['n_plus_one'] = [{'sql': shape, 'count': n} for shape, n in repeated.items()]
+                logger.warning(json.dumps(record), extra={'perf': record})
+                return response
+        if logger.isEnabledFor(logging.INFO):
+            record = stats.as_dict(request, response)
+            logger.info(json.dumps(record), extra={'perf': record})
+        return response
+
+    def process_template_response(self, request, response):
+        """DRF responses are rendered right after this hook; time the rendering."""
+        stats = request.perf_stats
+        start = time.perf_counter()
+
+        def rendered(response):
+            stats.render = time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
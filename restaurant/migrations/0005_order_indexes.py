@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0004_menuitem_category'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'in_progress')), fields=['table_number', 'status'], name='order_open_table_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='order_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0006_sync_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('menu_item_name', models.CharField(max_length=255)),
+                ('category', models.CharField(choices=[('APPETIZER', 'Appetizer'), ('MAIN', 'Main Dish'), ('DESSERT', 'Dessert'), ('DRINK', 'Drink')], max_length=20)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('menu_item', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='restaurant.menuitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'category'], name='dailysales_date_category_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'menu_item'), name='dailysales_date_item_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+def backfill_snapshot(apps, schema_editor):
+    """Copy the current menu price and name onto the existing order items."""
+    MenuItem = apps.get_model('restaurant', 'MenuItem')
+    OrderItem = apps.get_model('restaurant', 'OrderItem')
+    menu_item = MenuItem.objects.filter(pk=models.OuterRef('menu_item_id'))
+    OrderItem.objects.update(
+        unit_price=models.Subquery(menu_item.values('price')[:1]),
+        menu_item_name=models.Subquery(menu_item.values('name')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0007_dailysales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=6),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='menu_item_name',
+            field=models.CharField(default='', max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_snapshot, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0008_orderitem_price_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('table_number', models.IntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('placed_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('menu_item_name', models.CharField(max_length=255)),
+                ('category', models.CharField(choices=[('APPETIZER', 'Appetizer'), ('MAIN', 'Main Dish'), ('DESSERT', 'Dessert'), ('DRINK', 'Drink')], max_length=20)),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('quantity', models.PositiveIntegerField()),
+                ('menu_item', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='restaurant.menuitem')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='restaurant.archivedorder')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['created_at', 'id'], name='archivedorder_created_idx'),
+        ),
+    ]
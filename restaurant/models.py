@@ -1,5 +1,7 @@
+from decimal import Decimal
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 
 # Extend Django's built-in user model to support custom roles (manager/employee).
 class User(AbstractUser):
@@ -31,10 +33,31 @@ class MenuItem(models.Model):
         choices=Category.choices,
         default=Category.MAIN,
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Read by the delta sync endpoint
 
     def __str__(self):
         return f"{self.name} ({self.price:.2f}€) - Available: {self.availability} ({self.category})"
 
+class OrderQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Annotate each order with its total computed by the database
+        (sum of unit price x quantity over its items), read by Order.total_price.
+        """
+        totals = (
+            OrderItem.objects.filter(order=models.OuterRef('pk'))
+            .values('order')
+            .annotate(total=models.Sum(models.F('unit_price') * models.F('quantity')))
+            .values('total')
+        )
+        return self.annotate(
+            annotated_total=Coalesce(
+                models.Subquery(totals),
+                models.Value(Decimal('0.00')),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            )
+        )
+
 # Represents a single order placed at a specific table.
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -46,38 +69,150 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='in_progress')
     placed_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Finding the open order of a table (submit_order, OrderSerializer.create).
+            # Partial where the database supports it; MySQL ignores the condition
+            # and builds a plain (table_number, status) index instead.
+            models.Index(
+                fields=['table_number', 'status'],
+                condition=models.Q(status='in_progress'),
+                name='order_open_table_idx',
+            ),
+            # Completed orders log: filter on status, newest first.
+            models.Index(fields=['status', 'created_at', 'id'], name='order_status_created_idx'),
+        ]
 
     def __str__(self):
         return f"Order # {self.id} - Table {self.table_number} - {self.status} - placed by {self.placed_by.username} at {self.created_at.strftime('%Y-%m-%d %H:%M')}"
     
     @property
     def total_price(self):
-        """Calculate the total price of all items in the order."""
-        return sum(item.menu_item.price * item.quantity for item in self.items.all())
+        """
+        Calculate the total price of all items in the order.
+        Uses the database total when the order comes from OrderQuerySet.with_totals().
+        """
+        if hasattr(self, 'annotated_total'):
+            return self.annotated_total
+        return sum(item.unit_price * item.quantity for item in self.items.all())
 
 # Links a MenuItem to an Order (e.g. 2x Burger in Order #5).
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
     menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
+    # Price and name at the time the item was ordered, so totals and the order
+    # history don't change (or need a join) when the menu is edited.
+    unit_price = models.DecimalField(max_digits=6, decimal_places=2)
+    menu_item_name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
-        return f"{self.quantity} x {self.menu_item.name} for Order #{self.order.id}"
+        return f"{self.quantity} x {self.menu_item_name} for Order #{self.order_id}"
 
     def save(self, *args, **kwargs):
         """
-        When creating a new OrderItem (no existing PK), reduce the menu item's availability.
-        (Prevents overselling if stock < requested quantity).
+        When creating a new OrderItem (no existing PK), reduce the menu item's availability
+        and snapshot its current price and name unless they were given.
+        (Prevents overselling if stock < requested quantity; the check is done by the database.)
         """
-        if not self.pk:  # Only reduce stock if the object doesn't exist yet    
-            if self.menu_item.availability < self.quantity:
-                raise ValueError("Not enough availability.")
-            self.menu_item.availability -= self.quantity
-            self.menu_item.save()
-        super().save(*args, **kwargs)
+        from . import stock
+
+        with transaction.atomic():
+            if not self.pk:  # Only reduce stock if the object doesn't exist yet
+                if self.unit_price is None:
+                    self.unit_price = self.menu_item.price
+                if not self.menu_item_name:
+                    self.menu_item_name = self.menu_item.name
+                stock.reserve({self.menu_item_id: self.quantity})
+            super().save(*args, **kwargs)
 
     def restore_stock_and_delete(self):
         """If an item is removed from an order, return its stock."""
-        self.menu_item.availability += self.quantity
-        self.menu_item.save()
-        self.delete()
\ No newline at end of file
+        from . import stock
+
+        with transaction.atomic():
+            stock.release({self.menu_item_id: self.quantity})
+            Deletion.record(Deletion.ORDER_ITEM, [self.pk])
+            self.delete()
+
+# Revenue per day and menu item, kept up to date when orders are completed
+# (see restaurant.reports) so sales reports never scan the order history.
+class DailySales(models.Model):
+    date = models.DateField()
+    menu_item = models.ForeignKey(MenuItem, null=True, on_delete=models.SET_NULL)
+    menu_item_name = models.CharField(max_length=255)  # Kept if the menu item is deleted
+    category = models.CharField(max_length=20, choices=MenuItem.Category.choices)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'menu_item'], name='dailysales_date_item_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'category'], name='dailysales_date_category_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.menu_item_name}: {self.quantity} sold, {self.revenue:.2f}€"
+
+# Old completed orders moved out of the live tables by the archive_orders command
+# (see restaurant.archive). They keep the id they had as an Order and a stored total.
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    table_number = models.IntegerField()
+    created_at = models.DateTimeField()
+    placed_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='archivedorder_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order # {self.id} - Table {self.table_number} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, related_name='items', on_delete=models.CASCADE)
+    menu_item = models.ForeignKey(MenuItem, null=True, on_delete=models.SET_NULL)  # History outlives the menu
+    menu_item_name = models.CharField(max_length=255)
+    category = models.CharField(max_length=20, choices=MenuItem.Category.choices)
+    unit_price = models.DecimalField(max_digits=6, decimal_places=2)
+    quantity = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.quantity} x {self.menu_item_name} for archived order #{self.order_id}"
+
+# Tombstone left behind when a synced row is deleted, so delta sync clients can drop it.
+# Bulk updates and deletes don't set updated_at or send signals: code doing them must
+# set updated_at itself and call Deletion.record().
+class Deletion(models.Model):
+    ORDER = 'order'
+    ORDER_ITEM = 'order_item'
+    MENU_ITEM = 'menu_item'
+    KIND_CHOICES = [
+        (ORDER, 'Order'),
+        (ORDER_ITEM, 'Order item'),
+        (MENU_ITEM, 'Menu item'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id} deleted at {self.deleted_at.strftime('%Y-%m-%d %H:%M')}"
+
+    @classmethod
+    def record(cls, kind, ids):
+        """Store tombstones for the given ids in one query."""
+        if ids:
+            cls.objects.bulk_create([cls(kind=kind, object_id=pk) for pk in ids])
@@ -0,0 +1,106 @@
+"""
+Table occupancy board: table number -> summary of the table's open order.
+Each process keeps the index in memory. submit_order, POST /api/orders/ and
+complete_order update it once their transaction commits, so reading the board never touches the
+database. It is rebuilt from the open orders on first use and whenever it is
+older than OCCUPANCY_MAX_AGE seconds, which picks up changes made any other way
+(and by other worker processes).
+"""
+import threading
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from .models import Order
+
+
+def _summary(table_number, order_id, opened_at, items, total):
+    return {
+        'table_number': table_number,
+        'order': order_id,
+        'items': items,
+        'total_price': f"{total:.2f}",
+        'opened_at': opened_at,
+    }
+
+
+class OccupancyIndex:
+
+    def __init__(self):
+        self._tables = {}
+        self._built_at = None
+        self._replay = None  # Updates made while a rebuild is reading the database
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+
+    def _apply(self, tables, table_number, order_id, summary):
+        if summary is not None:
+            tables[table_number] = summary
+        elif tables.get(table_number, {}).get('order') == order_id:
+            del tables[table_number]
+
+    def _update(self, table_number, order_id, summary):
+        with self._lock:
+            self._apply(self._tables, table_number, order_id, summary)
+            if self._replay is not None:
+                self._replay.append((table_number, order_id, summary))
+
+    def order_open(self, order, items, total):
+        self._update(order.table_number, order.pk, _summary(order.table_number, order.pk, order.created_at, items, total))
+
+    def order_closed(self, order):
+        self._update(order.table_number, order.pk, None)
+
+    def rebuild(self):
+        with self._lock:
+            self._replay = []
+        rows = (
+            Order.objects.filter(status='in_progress')
+            .values('id', 'table_number', 'created_at')
+            .annotate(item_count=Sum('items__quantity'), total=Sum(F('items__quantity') * F('items__unit_price')))
+            .order_by('-id')  # submit_order uses the oldest open order of a table
+        )
+        tables = {
+            row['table_number']: _summary(row['table_number'], row['id'], row['created_at'],
+                                          row['item_count'] or 0, row['total'] or Decimal('0'))
+            for row in rows
+        }
+        with self._lock:
+            for update in self._replay:
+                self._apply(tables, *update)
+            self._tables, self._replay, self._built_at = tables, None, time.monotonic()
+
+    def invalidate(self):
+        """Rebuild on the next read."""
+        self._built_at = None
+
+    def age(self):
+        """Seconds since the index was last rebuilt from the database, or None before the first build."""
+        built_at = self._built_at
+        return None if built_at is None else time.monotonic() - built_at
+
+    def tables(self):
+        """Summaries of the occupied tables, by table number."""
+        built_at = self._built_at
+        if built_at is None or time.monotonic() - built_at > settings.OCCUPANCY_MAX_AGE:
+            # One thread rebuilds; the others keep serving the previous index if there is one
+            if self._rebuild_lock.acquire(blocking=built_at is None):
+                try:
+                    if self._built_at == built_at:
+                        self.rebuild()
+                finally:
+                    self._rebuild_lock.release()
+        with self._lock:
+            return [self._tables[table_number] for table_number in sorted(self._tables)]
+
+
+index = OccupancyIndex()
+
+
+def order_open_on_commit(order, items, total):
+    transaction.on_commit(lambda: index.order_open(order, items, total))
+
+
+def order_closed_on_commit(order):
+    transaction.on_commit(lambda: index.order_closed(order))
@@ -0,0 +1,121 @@
+"""
+Keyset pagination for order listings.
+Pages are cut on (created_at, id) instead of OFFSET, so fetching any page
+costs the same whether it is the first page or one deep into history.
+"""
+import base64
+import binascii
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _position(row):
+    if isinstance(row, dict):
+        return row['created_at'], row['id']
+    return row.created_at, row.pk
+
+
+class CreatedAtCursorPagination(BasePagination):
+    """
+    Newest-first pagination over (created_at, id).
+    Responses look like {"next": <url or null>, "results": [...]}.
+    """
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None, fetch=list):
+        return self.paginate_querysets([queryset], request, view, fetch)
+
+    def paginate_querysets(self, querysets, request, view=None, fetch=list):
+        """
+        Paginate several querysets (e.g. live and archived orders) as one list:
+        each is cut at the cursor and the pages are merged newest first.
+        Ids must be unique across the querysets. `fetch` turns a cut queryset
+        into its rows: model instances by default, or dicts with "created_at"
+        and "id" (e.g. from .values()).
+        """
+        position = self.start(request)
+        results = []
+        for queryset in querysets:
+            results.extend(fetch(self.cut(queryset, position)))
+        return self.page(results, merged=len(querysets) > 1)
+
+    async def apaginate_queryset(self, queryset, request, fetch):
+        """paginate_queryset() for async views; `fetch` is a coroutine function."""
+        position = self.start(request)
+        return self.page(await fetch(self.cut(queryset, position)))
+
+    def start(self, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        return self.decode_cursor(request)
+
+    def cut(self, queryset, position):
+        queryset = queryset.order_by('-created_at', '-id')
+        if position:
+            created_at, pk = position
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        # Fetch one extra row to know whether there is a next page
+        return queryset[:self.page_size + 1]
+
+    def page(self, results, merged=False):
+        if merged:
+            results.sort(key=_position, reverse=True)
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.next_position = _position(results[-1]) if self.has_next else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def encode_cursor(self, position):
+        created_at, pk = position
+        raw = f"{created_at.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk = base64.urlsafe_b64decode(encoded.encode()).decode().split('|')
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            created_at = None
+        if created_at is None:
+            raise NotFound('Invalid cursor')
+        return created_at, pk
@@ -0,0 +1,26 @@
+"""
+JSON renderer backed by orjson when it is installed (pip install orjson).
+The output is the same as DRF's JSONRenderer; anything orjson can't encode on
+its own goes through DRF's encoder, and without orjson this is JSONRenderer.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional dependency
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            # Datetimes go through DRF's encoder too: it trims microseconds to milliseconds
+            ret = orjson.dumps(data, default=JSONEncoder().default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:  # e.g. non-string dict keys
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped by JSONRenderer so the output is also valid JavaScript
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,126 @@
+"""
+Daily sales rollup.
+DailySales holds one row per day and menu item. Completing an order adds its
+lines to the rollup (record_completed_order), rebuild() recomputes a date range
+from the order history, and sales_report() answers reporting queries from the
+rollup alone, so their cost does not grow with the number of orders.
+"""
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, F, Max, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import ArchivedOrderItem, DailySales, OrderItem
+
+BATCH_SIZE = 1000
+
+# group_by name -> DailySales columns it groups on
+GROUPINGS = {
+    'day': ['date'],
+    'category': ['category'],
+    'item': ['menu_item_id', 'menu_item_name'],
+}
+
+
+def _order_lines(order):
+    """Sum the order's lines per menu item: {menu_item_id: (name, category, quantity, revenue)}."""
+    totals = {}
+    rows = order.items.values_list('menu_item_id', 'menu_item_name', 'menu_item__category', 'unit_price', 'quantity')
+    for menu_item_id, name, category, price, quantity in rows:
+        _, _, sold, revenue = totals.get(menu_item_id, (name, category, 0, Decimal('0')))
+        totals[menu_item_id] = (name, category, sold + quantity, revenue + price * quantity)
+    return totals
+
+
+def record_completed_order(order):
+    """
+    Add a completed order to the rollup of the day it was placed.
+    Must run in the transaction that completes the order.
+    """
+    lines = _order_lines(order)
+    if not lines:
+        return
+    date = timezone.localdate(order.created_at)
+    menu_item_ids = sorted(lines)
+
+    # Create the missing rows first and then only update rows that exist: locking
+    # absent (date, item) keys takes gap locks on InnoDB, and two orders completed
+    # on the same day could deadlock on them.
+    DailySales.objects.bulk_create([
+        DailySales(date=date, menu_item_id=menu_item_id, menu_item_name=lines[menu_item_id][0],
+                   category=lines[menu_item_id][1], quantity=0, revenue=Decimal('0'))
+        for menu_item_id in menu_item_ids
+    ], ignore_conflicts=True)
+    DailySales.objects.filter(date=date, menu_item_id__in=menu_item_ids).update(
+        quantity=F('quantity') + Case(
+            *[When(menu_item_id=pk, then=Value(lines[pk][2])) for pk in menu_item_ids],
+            output_field=DailySales._meta.get_field('quantity'),
+        ),
+        revenue=F('revenue') + Case(
+            *[When(menu_item_id=pk, then=Value(lines[pk][3])) for pk in menu_item_ids],
+            output_field=DailySales._meta.get_field('revenue'),
+        ),
+    )
+
+
+def _daily_lines(lines, category):
+    """Aggregate order lines per day and menu item; `category` is the lookup holding the line's category."""
+    return (
+        lines.annotate(date=TruncDate('order__created_at'))
+        .values('date', 'menu_item_id', category)
+        .annotate(name=Max('menu_item_name'), sold=Sum('quantity'), total=Sum(F('quantity') * F('unit_price')))
+        .values_list('date', 'menu_item_id', 'name', category, 'sold', 'total')
+        .order_by()
+    )
+
+
+def rebuild(start=None, end=None):
+    """
+    Recompute the rollup for [start, end] (dates, both optional) from completed
+    orders, live and archived. Returns the number of rows written.
+    """
+    rows = DailySales.objects.all()
+    lines = OrderItem.objects.filter(order__status='completed')
+    archived = ArchivedOrderItem.objects.all()
+    if start:
+        rows = rows.filter(date__gte=start)
+        lines = lines.filter(order__created_at__date__gte=start)
+        archived = archived.filter(order__created_at__date__gte=start)
+    if end:
+        rows = rows.filter(date__lte=end)
+        lines = lines.filter(order__created_at__date__lte=end)
+        archived = archived.filter(order__created_at__date__lte=end)
+
+    # A day can have both live and archived orders, so the two are merged here.
+    # Archived lines of deleted menu items have no id and are kept apart by name.
+    totals = {}
+    for aggregated in (_daily_lines(lines, 'menu_item__category'), _daily_lines(archived, 'category')):
+        for date, menu_item_id, name, category, sold, total in aggregated.iterator(chunk_size=BATCH_SIZE):
+            key = (date, menu_item_id, name if menu_item_id is None else None)
+            row = totals.get(key)
+            if row is None:
+                totals[key] = DailySales(date=date, menu_item_id=menu_item_id, menu_item_name=name,
+                                         category=category, quantity=sold, revenue=total)
+            else:
+                row.quantity += sold
+                row.revenue += total
+
+    with transaction.atomic():
+        rows.delete()
+        return len(DailySales.objects.bulk_create(list(totals.values()), batch_size=BATCH_SIZE))
+
+
+def sales_report(start, end, group_by):
+    """
+    Quantity and revenue between two dates (inclusive), grouped by any of
+    "day", "category" and "item" (e.g. ["day", "category"]).
+    """
+    keys = [column for name in group_by for column in GROUPINGS[name]]
+    rows = (
+        DailySales.objects.filter(date__gte=start, date__lte=end)
+        .values(*keys)
+        .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+        .order_by(*keys)
+    )
+    return [{**row, 'revenue': f"{row['revenue']:.2f}"} for row in rows]
+
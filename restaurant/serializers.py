@@ -1,11 +1,34 @@
+from django.db import transaction
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from .models import User, MenuItem, OrderItem, Order
+from .authentication import CLAIMS_ISSUED_AT
+from .stock import InsufficientStock
+from . import occupancy
 
 class MenuItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = MenuItem
         fields = ["id", "name", "price", "availability", "category"]
 
+# One entry of a bulk menu update (PATCH /api/menu-items/bulk/).
+class MenuItemBulkUpdateSerializer(serializers.Serializer):
+    id = serializers.IntegerField(min_value=1)
+    availability = serializers.IntegerField(min_value=0, required=False)
+    availability_delta = serializers.IntegerField(required=False)
+    price = serializers.DecimalField(max_digits=6, decimal_places=2, min_value=0, required=False)
+    category = serializers.ChoiceField(choices=MenuItem.Category.choices, required=False)
+
+    def validate(self, attrs):
+        if 'availability' in attrs and 'availability_delta' in attrs:
+            raise serializers.ValidationError("Give either availability or availability_delta, not both.")
+        if len(attrs) == 1:
+            raise serializers.ValidationError("Nothing to update.")
+        return attrs
+
+class MenuBulkUpdateSerializer(serializers.Serializer):
+    items = MenuItemBulkUpdateSerializer(many=True, allow_empty=False, max_length=1000)
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta: 
         model = User
@@ -15,14 +38,31 @@ class UserSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = User.objects.create_user(**validated_data)
         return user
+
+# Issued by /api/token/: the username and role claims let CachedJWTAuthentication
+# skip the user lookup when AUTH_TRUST_TOKEN_CLAIMS is on.
+class TokenObtainPairWithRoleSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.username
+        token['role'] = user.role
+        token[CLAIMS_ISSUED_AT] = token['iat']
+        return token
     
 class OrderItemSerializer(serializers.ModelSerializer):
-    menu_item_name = serializers.CharField(source='menu_item.name', read_only=True)
-    price = serializers.DecimalField(source='menu_item.price', max_digits=8, decimal_places=2, read_only=True)
+    price = serializers.DecimalField(source='unit_price', max_digits=8, decimal_places=2, read_only=True)
 
     class Meta:
         model = OrderItem
         fields = ['id', 'menu_item', 'menu_item_name', 'price', 'quantity']
+        read_only_fields = ['menu_item_name']
+
+# Used for validating submitted order lines without hitting the database
+# (menu items are resolved in bulk by the submit pipeline).
+class OrderItemInputSerializer(serializers.Serializer):
+    menu_item = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
 
 class OrderSerializer(serializers.ModelSerializer):
     placed_by = serializers.StringRelatedField(read_only=True)
@@ -46,10 +86,18 @@ class OrderSerializer(serializers.ModelSerializer):
         if Order.objects.filter(table_number=validated_data['table_number'], status='in_progress').exists():
             raise serializers.ValidationError("An active order already exists for this table.")
 
-        order = Order.objects.create(placed_by=user, **validated_data)
+        with transaction.atomic():
+            order = Order.objects.create(placed_by=user, **validated_data)
 
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
+            lines = []
+            for item_data in items_data:
+                try:
+                    lines.append(OrderItem.objects.create(order=order, **item_data))
+                except InsufficientStock as exc:
+                    raise serializers.ValidationError(str(exc))
+            occupancy.order_open_on_commit(
+                order, sum(line.quantity for line in lines), sum(line.unit_price * line.quantity for line in lines)
+            )
 
         return order
 
@@ -61,4 +109,17 @@ class CompletedOrderSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = ["id", "table_number", "created_at", "items", "total_price"]
\ No newline at end of file
+        fields = ["id", "table_number", "created_at", "items", "total_price"]
+
+# Flat rows used by the delta sync endpoint (items are sent separately).
+class OrderSyncSerializer(serializers.ModelSerializer):
+    placed_by = serializers.StringRelatedField(read_only=True)
+    total_price = serializers.DecimalField(max_digits=8, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ['id', 'table_number', 'placed_by', 'status', 'created_at', 'updated_at', 'total_price']
+
+class OrderItemSyncSerializer(OrderItemSerializer):
+    class Meta(OrderItemSerializer.Meta):
+        fields = ['id', 'order', 'menu_item', 'menu_item_name', 'price', 'quantity', 'updated_at']
@@ -0,0 +1,171 @@
+"""
+Order submission and bulk menu update pipelines.
+Both work on the whole set of submitted items at once, so the number of
+queries stays the same no matter how many lines an order (or update) has.
+"""
+from collections import Counter
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from rest_framework import serializers
+from .models import Deletion, MenuItem, Order, OrderItem
+from . import events, menu_cache, occupancy, stock
+
+
+def submit_order(table_number, items, user):
+    """
+    Create the in-progress order for a table, or amend the existing one.
+    `items` is a list of validated {"menu_item": id, "quantity": n} dicts and
+    describes the full desired order; lines for the same menu item are merged.
+
+    An existing order is diffed against `items`: only the lines that were added,
+    changed or removed are written, and stock moves by the net difference.
+    Runs in one transaction: if stock runs out stock.InsufficientStock is raised
+    and nothing is written.
+
+    Returns (order, changes) where changes lists the menu item ids that were
+    "added", "updated" and "removed".
+    """
+    quantities = Counter()
+    for item in items:
+        quantities[item['menu_item']] += item['quantity']
+
+    with transaction.atomic():
+        menu_items = MenuItem.objects.in_bulk(list(quantities))
+        missing = [pk for pk in quantities if pk not in menu_items]
+        if missing:
+            raise serializers.ValidationError(
+                {"menu_item": [f'Invalid pk "{pk}" - object does not exist.' for pk in missing]}
+            )
+
+        order = (
+            Order.objects.select_for_update()
+            .filter(table_number=table_number, status='in_progress')
+            .first()
+        )
+        if not order:
+            order = Order.objects.create(
+                table_number=table_number,
+                placed_by=user,
+                status='in_progress'
+            )
+            created = True
+            lines, duplicates = {}, {}
+        else:
+            created = False
+            lines, duplicates = _current_lines(order)
+            if duplicates:
+                duplicate_ids = [pk for ids in duplicates.values() for pk in ids]
+                OrderItem.objects.filter(pk__in=duplicate_ids).delete()
+                Deletion.record(Deletion.ORDER_ITEM, duplicate_ids)
+
+        added = [pk for pk in quantities if pk not in lines]
+        updated = [pk for pk in quantities if pk in lines and lines[pk].quantity != quantities[pk]]
+        removed = [pk for pk in lines if pk not in quantities]
+
+        deltas = {pk: quantities[pk] for pk in added}
+        deltas.update({pk: quantities[pk] - lines[pk].quantity for pk in updated})
+        deltas.update({pk: -lines[pk].quantity for pk in removed})
+        stock.adjust(deltas)
+
+        now = timezone.now()
+        if removed:
+            removed_ids = [lines[pk].pk for pk in removed]
+            OrderItem.objects.filter(pk__in=removed_ids).delete()
+            Deletion.record(Deletion.ORDER_ITEM, removed_ids)
+        # Folded duplicate lines must be rewritten even if the total did not change
+        rewrite = updated + [pk for pk in duplicates if pk in quantities and pk not in updated]
+        if rewrite:
+            for pk in rewrite:
+                lines[pk].quantity = quantities[pk]
+                lines[pk].updated_at = now
+            OrderItem.objects.bulk_update([lines[pk] for pk in rewrite], ['quantity', 'updated_at'])
+        if added:
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, menu_item=menu_items[pk], quantity=quantities[pk],
+                          unit_price=menu_items[pk].price, menu_item_name=menu_items[pk].name)
+                for pk in added
+            ])
+        if not created and (added or rewrite or removed):
+            # Let sync clients know the amended order changed
+            Order.objects.filter(pk=order.pk).update(updated_at=now)
+
+        changes = {"added": added, "updated": updated, "removed": removed}
+        if created:
+            events.order_changed(events.ORDER_CREATED, order)
+        elif added or updated or removed:
+            events.order_changed(events.ORDER_AMENDED, order, changes=changes)
+
+        # Kept lines keep the price they were ordered at
+        prices = {pk: lines[pk].unit_price if pk in lines else menu_items[pk].price for pk in quantities}
+        occupancy.order_open_on_commit(
+            order, sum(quantities.values()), sum(prices[pk] * quantity for pk, quantity in quantities.items())
+        )
+
+    return order, changes
+
+
+def _current_lines(order):
+    """
+    Load the order's lines keyed by menu item id.
+    Older orders may hold several lines for one menu item: those are folded
+    into the first line, and the ids of the extra lines are returned for deletion
+    as {menu_item_id: [line ids]}.
+    """
+    lines = {}
+    duplicates = {}
+    for line in order.items.order_by('id'):
+        if line.menu_item_id in lines:
+            lines[line.menu_item_id].quantity += line.quantity
+            duplicates.setdefault(line.menu_item_id, []).append(line.pk)
+        else:
+            lines[line.menu_item_id] = line
+    return lines, duplicates
+
+
+def update_menu(updates):
+    """
+    Apply a bulk menu update in one transaction.
+    `updates` is a list of validated {"id", and any of "availability",
+    "availability_delta", "price", "category"} dicts, one per menu item.
+    The rows are locked and checked first; if any update is invalid a
+    ValidationError with one error dict per update ({} for valid ones) is
+    raised and nothing is written. Otherwise all columns are set by a single
+    UPDATE, and the menu cache is invalidated once.
+
+    Returns the ids of the updated menu items.
+    """
+    ids = [update['id'] for update in updates]
+    with transaction.atomic():
+        current = MenuItem.objects.select_for_update().in_bulk(ids)
+        errors = [{} for _ in updates]
+        seen = set()
+        for error, update in zip(errors, updates):
+            pk = update['id']
+            if pk not in current:
+                error['id'] = [f'Invalid pk "{pk}" - object does not exist.']
+            elif pk in seen:
+                error['id'] = ["Menu item is listed more than once."]
+            elif current[pk].availability + update.get('availability_delta', 0) < 0:
+                error['availability_delta'] = [f"Only {current[pk].availability} available."]
+            seen.add(pk)
+        if any(errors):
+            raise serializers.ValidationError({"items": errors})
+
+        columns = {}
+        for name in ('availability', 'price', 'category'):
+            whens = [When(pk=update['id'], then=Value(update[name])) for update in updates if name in update]
+            if name == 'availability':
+                whens += [
+                    When(pk=update['id'], then=F('availability') + Value(update['availability_delta']))
+                    for update in updates if 'availability_delta' in update
+                ]
+            if whens:
+                columns[name] = Case(*whens, default=F(name), output_field=MenuItem._meta.get_field(name))
+        MenuItem.objects.filter(pk__in=ids).update(**columns, updated_at=timezone.now())
+
+        menu_cache.invalidate_on_commit()
+        stock_changed = [update['id'] for update in updates if 'availability' in update or 'availability_delta' in update]
+        if stock_changed:
+            events.availability_changed(stock_changed)
+    return ids
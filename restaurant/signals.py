@@ -0,0 +1,39 @@
+"""
+Model signal handlers, connected in RestaurantConfig.ready().
+Bulk stock changes and bulk deletes do not send signals;
+restaurant.stock and restaurant.services handle those themselves.
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from .models import Deletion, MenuItem, Order, User
+from . import authentication, menu_cache, occupancy
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def invalidate_menu(sender, **kwargs):
+    menu_cache.invalidate_on_commit()
+
+
+@receiver(pre_delete, sender=Order)
+def record_order_deletion(sender, instance, **kwargs):
+    """Leave tombstones for the order and the lines deleted with it."""
+    Deletion.record(Deletion.ORDER_ITEM, list(instance.items.values_list('pk', flat=True)))
+    Deletion.record(Deletion.ORDER, [instance.pk])
+    occupancy.order_closed_on_commit(instance)
+
+
+@receiver(pre_delete, sender=MenuItem)
+def record_menu_item_deletion(sender, instance, **kwargs):
+    """Leave tombstones for the menu item and the order lines deleted with it."""
+    Deletion.record(Deletion.ORDER_ITEM, list(instance.orderitem_set.values_list('pk', flat=True)))
+    Deletion.record(Deletion.MENU_ITEM, [instance.pk])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, update_fields=None, **kwargs):
+    """Drop the user from the authentication cache (logins only touch last_login)."""
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    authentication.forget_user_on_commit(instance.pk)
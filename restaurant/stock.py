@@ -0,0 +1,114 @@
+"""
+Stock reservation engine for MenuItem.availability.
+All changes are done as conditional UPDATEs in the database
+(`availability = availability - n WHERE availability >= n`),
+so concurrent waiters can never oversell or overwrite each other's changes.
+"""
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from .models import MenuItem
+from . import events, menu_cache
+
+# How many times a batch is retried when a row fails the WHERE clause
+# but has enough stock again by the time we look at it (concurrent restore).
+RESERVE_ATTEMPTS = 3
+
+
+class InsufficientStock(ValueError):
+    """
+    Raised when one or more menu items do not have enough availability.
+    `shortages` holds one {"menu_item", "requested", "available"} dict per item.
+    """
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__("Not enough availability.")
+
+
+class _Conflict(Exception):
+    """Internal: the conditional UPDATE touched fewer rows than requested."""
+
+
+def _per_item(quantities):
+    """Build a CASE expression mapping each menu item id to its quantity."""
+    return Case(
+        *[When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+def _shortages(deltas):
+    """Compare requested quantities against the current availability."""
+    current = dict(MenuItem.objects.filter(pk__in=list(deltas)).values_list('pk', 'availability'))
+    return [
+        {"menu_item": pk, "requested": delta, "available": current.get(pk, 0)}
+        for pk, delta in deltas.items()
+        if delta > 0 and current.get(pk, 0) < delta
+    ]
+
+
+def _apply(deltas):
+    """
+    Apply {menu_item_id: delta} in one conditional UPDATE inside a savepoint.
+    Positive deltas take stock, negative deltas give it back.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    shortages = []
+    for _ in range(RESERVE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                updated = MenuItem.objects.filter(
+                    pk__in=list(deltas), availability__gte=_per_item(deltas)
+                ).update(
+                    availability=F('availability') - _per_item(deltas),
+                    updated_at=timezone.now(),
+                )
+                if updated != len(deltas):
+                    raise _Conflict
+            menu_cache.invalidate_on_commit()
+            events.availability_changed(deltas)
+            return
+        except _Conflict:
+            shortages = _shortages(deltas)
+            if shortages:
+                break
+
+    raise InsufficientStock(shortages or [
+        {"menu_item": pk, "requested": delta, "available": None}
+        for pk, delta in deltas.items() if delta > 0
+    ])
+
+
+def reserve(quantities):
+    """
+    Take stock for {menu_item_id: quantity} in a single statement.
+    Either every item is reserved or none is (the UPDATE runs in a savepoint).
+    Raises InsufficientStock with per-item details when stock runs out.
+    """
+    _apply(quantities)
+
+
+def adjust(deltas):
+    """
+    Move stock by the net difference for {menu_item_id: delta} in a single statement.
+    Used when an order is amended: positive deltas are reserved, negative ones returned.
+    Raises InsufficientStock like reserve() when an increase cannot be covered.
+    """
+    _apply(deltas)
+
+
+def release(quantities):
+    """Give stock back for {menu_item_id: quantity} in a single statement."""
+    quantities = {pk: quantity for pk, quantity in quantities.items() if quantity}
+    if not quantities:
+        return
+    MenuItem.objects.filter(pk__in=list(quantities)).update(
+        availability=F('availability') + _per_item(quantities),
+        updated_at=timezone.now(),
+    )
+    menu_cache.invalidate_on_commit()
+    events.availability_changed(quantities)
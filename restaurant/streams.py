@@ -0,0 +1,68 @@
+"""
+Server-sent events stream of live order and menu events.
+This is a native async view: under the ASGI server (backend/asgi.py) an idle
+connection is just a coroutine waiting on its queue, not a worker thread.
+"""
+import json
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .authentication import CachedJWTAuthentication
+from .events import get_broker
+
+
+async def _authenticate(request):
+    """
+    Resolve the JWT from the Authorization header or, because browsers'
+    EventSource cannot send headers, from the ?token= query parameter.
+    """
+    authenticator = CachedJWTAuthentication()
+    raw_token = request.GET.get('token')
+    if not raw_token:
+        header = authenticator.get_header(request)
+        raw_token = header and authenticator.get_raw_token(header)
+    if not raw_token:
+        return None
+    try:
+        validated_token = authenticator.get_validated_token(raw_token)
+        return await authenticator.aget_user(validated_token)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+def _format(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def _stream(broker):
+    subscription = broker.subscribe()
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            event = await subscription.get(timeout=settings.EVENT_STREAM_HEARTBEAT)
+            # A comment line keeps proxies and the browser from dropping an idle connection
+            yield _format(event) if event else ": keep-alive\n\n"
+    finally:
+        subscription.close()
+
+
+@require_GET
+async def order_events(request):
+    """
+    GET /api/events/ — order created/amended/completed and menu availability events.
+    Any logged-in employee or manager may listen.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "Live events are only available under the ASGI server."}, status=501)
+
+    user = await _authenticate(request)
+    if user is None or not user.is_active:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    response = StreamingHttpResponse(_stream(get_broker()), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream
+    return response
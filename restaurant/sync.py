@@ -0,0 +1,66 @@
+"""
+Delta sync for orders, order lines and the menu.
+A sync token is the server time (in microseconds) at which the previous sync
+started. Rows are matched on their updated_at column and deletions on the
+Deletion tombstones. Every query looks back SYNC_OVERLAP_SECONDS before the
+token, so rows from transactions that committed late are not missed. Clients
+must therefore apply the results idempotently (upsert by id).
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from .models import Deletion, MenuItem, Order, OrderItem
+from .serializers import MenuItemSerializer, OrderItemSyncSerializer, OrderSyncSerializer
+
+
+def make_token(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def parse_token(token):
+    try:
+        return datetime.fromtimestamp(int(token) / 1_000_000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise ValidationError({"since": "Invalid sync token."})
+
+
+def _payload(started, orders, items, menu_items, deleted=None, full=False):
+    deleted = deleted or []
+    return {
+        "token": make_token(started),
+        "full": full,
+        "orders": OrderSyncSerializer(orders, many=True).data,
+        "order_items": OrderItemSyncSerializer(items, many=True).data,
+        "menu_items": MenuItemSerializer(menu_items, many=True).data,
+        "deleted": {
+            kind: [object_id for row_kind, object_id in deleted if row_kind == kind]
+            for kind in (Deletion.ORDER, Deletion.ORDER_ITEM, Deletion.MENU_ITEM)
+        },
+    }
+
+
+def snapshot():
+    """Everything a fresh client needs: open orders with their lines and the whole menu."""
+    started = timezone.now()
+    orders = Order.objects.filter(status='in_progress').with_totals().select_related('placed_by')
+    items = OrderItem.objects.filter(order__status='in_progress')
+    return _payload(started, orders, items, MenuItem.objects.all(), full=True)
+
+
+def changes_since(token):
+    """
+    Rows created, changed or deleted since the token.
+    Falls back to a full snapshot when the token is older than the tombstone retention.
+    """
+    since = parse_token(token)
+    started = timezone.now()
+    if since < started - timedelta(days=settings.SYNC_TOMBSTONE_DAYS):
+        return snapshot()
+
+    cutoff = since - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+    orders = Order.objects.filter(updated_at__gte=cutoff).with_totals().select_related('placed_by')
+    items = OrderItem.objects.filter(updated_at__gte=cutoff)
+    menu_items = MenuItem.objects.filter(updated_at__gte=cutoff)
+    deleted = Deletion.objects.filter(deleted_at__gte=cutoff).values_list('kind', 'object_id')
+    return _payload(started, orders, items, menu_items, deleted=list(deleted))
@@ -1,3 +1,1474 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .models import User, MenuItem, Order, OrderItem, DailySales, Deletion, ArchivedOrder, ArchivedOrderItem
+from .db_router import ReplicaRouter
+from .middleware import sql_shape, view_name
+from .renderers import FastJSONRenderer
+from .serializers import MenuItemSerializer, OrderSerializer
+from .pagination import CreatedAtCursorPagination
+from .views import CompletedOrdersView, OrderViewSet
+from . import archive, authentication, checks, db_router, events, exports, fastpath, kitchen, menu_cache, occupancy, reports, stock
 
-# Create your tests here.
+
+# Test data lives in the primary's test transaction, which a replica connection can't see
+@override_settings(DATABASE_ROUTERS=[])
+class RestaurantTestCase(TestCase):
+    """Common fixtures: one employee, one manager and a small menu."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = User.objects.create_user(username="waiter", password="pass", role="employee")
+        cls.manager = User.objects.create_user(username="boss", password="pass", role="manager")
+        cls.menu = [
+            MenuItem.objects.create(
+                name=f"Dish {i}",
+                price=Decimal("5.00") + i,
+                availability=50,
+                category=MenuItem.Category.MAIN,
+            )
+            for i in range(12)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+
+    def submit(self, table_number, items):
+        return self.client.post(
+            "/api/orders/submit/",
+            {"table_number": table_number, "items": items},
+            format="json",
+        )
+
+    def availability(self, menu_item):
+        return MenuItem.objects.get(pk=menu_item.pk).availability
+
+
+class SubmitOrderTests(RestaurantTestCase):
+
+    def test_submit_creates_order_and_takes_stock(self):
+        response = self.submit(1, [
+            {"menu_item": self.menu[0].pk, "quantity": 2},
+            {"menu_item": self.menu[1].pk, "quantity": 3},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["items"]), 2)
+        self.assertEqual(self.availability(self.menu[0]), 48)
+        self.assertEqual(self.availability(self.menu[1]), 47)
+
+    def test_resubmit_replaces_items_and_restores_stock(self):
+        self.submit(1, [{"menu_item": self.menu[0].pk, "quantity": 2}])
+        response = self.submit(1, [{"menu_item": self.menu[1].pk, "quantity": 1}])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.filter(table_number=1).count(), 1)
+        self.assertEqual(self.availability(self.menu[0]), 50)
+        self.assertEqual(self.availability(self.menu[1]), 49)
+
+    def test_insufficient_stock_writes_nothing(self):
+        response = self.submit(1, [
+            {"menu_item": self.menu[0].pk, "quantity": 2},
+            {"menu_item": self.menu[1].pk, "quantity": 51},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self.availability(self.menu[0]), 50)
+
+    def test_unknown_menu_item_is_rejected(self):
+        response = self.submit(1, [{"menu_item": 9999, "quantity": 1}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OrderItem.objects.exists())
+
+    def count_submit_queries(self, table_number, items):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.submit(table_number, items)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_depend_on_item_count(self):
+        one = [{"menu_item": self.menu[0].pk, "quantity": 1}]
+        twelve = [{"menu_item": item.pk, "quantity": 1} for item in self.menu]
+
+        # New orders
+        self.assertEqual(self.count_submit_queries(1, one), self.count_submit_queries(2, twelve))
+
+        # Amendments that update, add and remove lines
+        def amend(size):
+            kept, dropped, new = self.menu[:size], self.menu[size:2 * size], self.menu[2 * size:3 * size]
+            return (
+                [{"menu_item": item.pk, "quantity": 1} for item in kept + dropped],
+                [{"menu_item": item.pk, "quantity": 2} for item in kept + new],
+            )
+
+        small_before, small_after = amend(1)
+        large_before, large_after = amend(4)
+        self.submit(3, small_before)
+        self.submit(4, large_before)
+        self.assertEqual(self.count_submit_queries(3, small_after), self.count_submit_queries(4, large_after))
+
+
+class OrderAmendmentTests(RestaurantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.submit(1, [
+            {"menu_item": self.menu[0].pk, "quantity": 2},
+            {"menu_item": self.menu[1].pk, "quantity": 1},
+        ])
+        self.lines = dict(OrderItem.objects.values_list("menu_item_id", "id"))
+
+    def test_only_changed_lines_are_written(self):
+        response = self.submit(1, [
+            {"menu_item": self.menu[0].pk, "quantity": 3},
+            {"menu_item": self.menu[2].pk, "quantity": 1},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["changes"], {
+            "added": [self.menu[2].pk],
+            "updated": [self.menu[0].pk],
+            "removed": [self.menu[1].pk],
+        })
+        # The bumped line keeps its row, the removed one is gone
+        line = OrderItem.objects.get(menu_item=self.menu[0])
+        self.assertEqual(line.pk, self.lines[self.menu[0].pk])
+        self.assertEqual(line.quantity, 3)
+        self.assertFalse(OrderItem.objects.filter(menu_item=self.menu[1]).exists())
+
+    def test_stock_moves_by_net_difference(self):
+        self.submit(1, [
+            {"menu_item": self.menu[0].pk, "quantity": 3},
+            {"menu_item": self.menu[2].pk, "quantity": 4},
+        ])
+
+        self.assertEqual(self.availability(self.menu[0]), 47)
+        self.assertEqual(self.availability(self.menu[1]), 50)
+        self.assertEqual(self.availability(self.menu[2]), 46)
+
+    def test_identical_resubmit_writes_nothing(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.submit(1, [
+                {"menu_item": self.menu[1].pk, "quantity": 1},
+                {"menu_item": self.menu[0].pk, "quantity": 2},
+            ])
+
+        self.assertEqual(response.data["changes"], {"added": [], "updated": [], "removed": []})
+        writes = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith(("INSERT", "UPDATE", "DELETE"))]
+        self.assertEqual(writes, [])
+
+    def test_failed_increase_keeps_order_untouched(self):
+        response = self.submit(1, [{"menu_item": self.menu[0].pk, "quantity": 60}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(OrderItem.objects.count(), 2)
+        self.assertEqual(self.availability(self.menu[0]), 48)
+        self.assertEqual(self.availability(self.menu[1]), 49)
+
+    def test_duplicate_legacy_lines_are_folded(self):
+        order = Order.objects.get(table_number=1)
+        OrderItem.objects.create(order=order, menu_item=self.menu[0], quantity=1)
+
+        response = self.submit(1, [{"menu_item": self.menu[0].pk, "quantity": 3}])
+
+        self.assertEqual(response.data["changes"]["removed"], [self.menu[1].pk])
+        self.assertEqual(list(order.items.values_list("quantity", flat=True)), [3])
+        self.assertEqual(self.availability(self.menu[0]), 47)
+
+
+class StockReservationTests(RestaurantTestCase):
+
+    def test_insufficient_stock_reports_each_item(self):
+        response = self.submit(1, [
+            {"menu_item": self.menu[0].pk, "quantity": 60},
+            {"menu_item": self.menu[1].pk, "quantity": 1},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["items"], [
+            {"menu_item": self.menu[0].pk, "requested": 60, "available": 50},
+        ])
+
+    def test_restore_goes_through_engine(self):
+        order = Order.objects.create(table_number=1, placed_by=self.employee)
+        item = OrderItem.objects.create(order=order, menu_item=self.menu[0], quantity=5)
+        self.assertEqual(self.availability(self.menu[0]), 45)
+
+        item.restore_stock_and_delete()
+
+        self.assertEqual(self.availability(self.menu[0]), 50)
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_order_item_save_refuses_to_oversell(self):
+        order = Order.objects.create(table_number=1, placed_by=self.employee)
+
+        with self.assertRaises(stock.InsufficientStock):
+            OrderItem.objects.create(order=order, menu_item=self.menu[0], quantity=51)
+        self.assertEqual(self.availability(self.menu[0]), 50)
+
+
+class StockConcurrencyTests(TransactionTestCase):
+    """Hammer one menu item from several threads at once."""
+
+    THREADS = 8
+    ATTEMPTS = 25
+    INITIAL = 100
+
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("threads can't share an in-memory SQLite test database; use a file with a busy timeout")
+
+    def test_concurrent_reservations_never_oversell_or_drift(self):
+        menu_item = MenuItem.objects.create(name="Fish", price=Decimal("10.00"), availability=self.INITIAL)
+        reserved = []
+        released = []
+        observed = []
+        errors = []
+        lock = threading.Lock()
+
+        def waiter(number):
+            try:
+                for attempt in range(self.ATTEMPTS):
+                    try:
+                        with transaction.atomic():
+                            stock.reserve({menu_item.pk: 1})
+                    except stock.InsufficientStock:
+                        continue
+                    with lock:
+                        reserved.append(1)
+                    # Every third waiter changes their mind and gives it back
+                    if (number + attempt) % 3 == 0:
+                        with transaction.atomic():
+                            stock.release({menu_item.pk: 1})
+                        with lock:
+                            released.append(1)
+                    observed.append(MenuItem.objects.get(pk=menu_item.pk).availability)
+            except Exception as exc:  # A thread's exception would otherwise be lost
+                with lock:
+                    errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=waiter, args=(n,)) for n in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        final = MenuItem.objects.get(pk=menu_item.pk).availability
+        # Reservations only fail once the stock has run out, so at least INITIAL succeed
+        self.assertGreaterEqual(len(reserved), self.INITIAL)
+        self.assertGreaterEqual(min(observed + [final]), 0)
+        self.assertEqual(final, self.INITIAL - len(reserved) + len(released))
+        self.assertLessEqual(len(reserved) - len(released), self.INITIAL)
+
+
+class OrderTotalTests(RestaurantTestCase):
+
+    def test_annotated_totals_match_property(self):
+        self.submit(1, [
+            {"menu_item": self.menu[0].pk, "quantity": 2},
+            {"menu_item": self.menu[3].pk, "quantity": 1},
+        ])
+        self.submit(2, [{"menu_item": self.menu[11].pk, "quantity": 4}])
+        Order.objects.create(table_number=3, placed_by=self.employee)
+
+        annotated = {order.pk: order.total_price for order in Order.objects.with_totals()}
+        computed = {order.pk: order.total_price for order in Order.objects.all()}
+
+        self.assertEqual(annotated, computed)
+        self.assertEqual(annotated[Order.objects.get(table_number=1).pk], Decimal("18.00"))
+
+    def test_totals_need_no_item_queries(self):
+        for table in range(1, 4):
+            self.submit(table, [{"menu_item": self.menu[table].pk, "quantity": table}])
+
+        with self.assertNumQueries(1):
+            totals = [order.total_price for order in Order.objects.with_totals()]
+        self.assertEqual(totals, [Decimal("6.00"), Decimal("14.00"), Decimal("24.00")])
+
+    def test_list_endpoints_serialize_annotated_totals(self):
+        self.submit(1, [{"menu_item": self.menu[2].pk, "quantity": 3}])
+        order = Order.objects.get()
+        Order.objects.filter(pk=order.pk).update(status="completed")
+        self.client.force_authenticate(self.manager)
+
+        orders = self.client.get("/api/orders/?status=completed").data["results"]
+        completed = self.client.get("/api/completed-orders/").data["results"]
+
+        self.assertEqual(orders[0]["total_price"], "21.00")
+        self.assertEqual(Decimal(completed[0]["total_price"]), Decimal("21.00"))
+
+    def test_price_changes_do_not_rewrite_history(self):
+        self.submit(1, [{"menu_item": self.menu[2].pk, "quantity": 3}])
+        MenuItem.objects.filter(pk=self.menu[2].pk).update(price=Decimal("99.00"), name="Renamed")
+        # An amendment keeps the price the line was ordered at; new lines get today's price
+        self.submit(1, [
+            {"menu_item": self.menu[2].pk, "quantity": 4},
+            {"menu_item": self.menu[3].pk, "quantity": 1},
+        ])
+        MenuItem.objects.filter(pk=self.menu[3].pk).update(price=Decimal("1.00"))
+        self.client.force_authenticate(self.manager)
+
+        order = self.client.get("/api/orders/").data["results"][0]
+
+        self.assertEqual(order["total_price"], "36.00")
+        first = next(item for item in order["items"] if item["menu_item"] == self.menu[2].pk)
+        self.assertEqual((first["menu_item_name"], first["price"]), ("Dish 2", "7.00"))
+        self.assertEqual(Order.objects.get().total_price, Decimal("36.00"))
+
+    def test_order_reads_do_not_join_the_menu(self):
+        for table in range(1, 4):
+            self.submit(table, [{"menu_item": self.menu[table].pk, "quantity": table}])
+        self.client.force_authenticate(self.manager)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/orders/")
+        self.assertFalse(any("restaurant_menuitem" in q["sql"] for q in queries.captured_queries))
+
+
+class CompletedOrdersTests(RestaurantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.manager)
+
+    def complete_orders(self, count, created_at=None):
+        created_at = created_at or timezone.now()
+        orders = Order.objects.bulk_create([
+            Order(table_number=n, placed_by=self.employee, status="completed")
+            for n in range(count)
+        ])
+        # auto_now_add ignores explicit values, so set the timestamps afterwards
+        Order.objects.filter(pk__in=[o.pk for o in orders]).update(created_at=created_at)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=self.menu[n % 12], quantity=2,
+                      unit_price=self.menu[n % 12].price, menu_item_name=self.menu[n % 12].name)
+            for n, order in enumerate(orders)
+        ])
+        return orders
+
+    def fetch_all(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(order["id"] for order in response.data["results"])
+            url = response.data["next"]
+        return ids
+
+    def test_pages_cover_every_order_once_even_with_equal_timestamps(self):
+        orders = self.complete_orders(7)
+
+        ids = self.fetch_all("/api/completed-orders/?page_size=3")
+
+        self.assertEqual(ids, sorted((o.pk for o in orders), reverse=True))
+
+    def test_page_size_is_capped(self):
+        self.complete_orders(5)
+        response = self.client.get("/api/completed-orders/?page_size=100000")
+        self.assertEqual(len(response.data["results"]), 5)
+        self.assertIsNone(response.data["next"])
+
+    def test_query_count_is_fixed(self):
+        self.complete_orders(2)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get("/api/completed-orders/")
+        self.complete_orders(30)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get("/api/completed-orders/")
+
+        self.assertEqual(len(response.data["results"]), 32)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_date_range_filter(self):
+        old = self.complete_orders(2, created_at=timezone.make_aware(datetime(2025, 1, 10, 20, 0)))
+        self.complete_orders(3, created_at=timezone.make_aware(datetime(2025, 2, 10, 20, 0)))
+
+        ids = self.fetch_all("/api/completed-orders/?from=2025-01-01&to=2025-01-10")
+
+        self.assertEqual(sorted(ids), sorted(o.pk for o in old))
+
+    def test_invalid_parameters_are_rejected(self):
+        self.assertEqual(self.client.get("/api/completed-orders/?from=yesterday").status_code, 400)
+        self.assertEqual(self.client.get("/api/completed-orders/?cursor=nonsense").status_code, 404)
+
+
+class QueryPlanTests(RestaurantTestCase):
+    """Guard the hot order lookups against falling back to full table scans."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        orders = Order.objects.bulk_create([
+            Order(table_number=n % 40, placed_by=cls.employee, status="completed" if n % 10 else "in_progress")
+            for n in range(400)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=cls.menu[0], quantity=1,
+                      unit_price=cls.menu[0].price, menu_item_name=cls.menu[0].name)
+            for order in orders
+        ])
+        # Refresh planner statistics so the plans reflect the data above
+        keyword = "ANALYZE TABLE" if connection.vendor == "mysql" else "ANALYZE"
+        with connection.cursor() as cursor:
+            cursor.execute(f"{keyword} {Order._meta.db_table}")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"{index_name} not used:\n{plan}")
+
+    def test_open_order_for_table_uses_index(self):
+        queryset = Order.objects.filter(table_number=7, status="in_progress")
+        self.assertUsesIndex(queryset, "order_open_table_idx")
+
+    def test_completed_log_uses_index(self):
+        queryset = Order.objects.filter(status="completed").order_by("-created_at", "-id")[:50]
+        self.assertUsesIndex(queryset, "order_status_created_idx")
+
+    def test_completed_log_is_read_in_index_order(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Sort detection is written against SQLite's plan output")
+        queryset = Order.objects.filter(status="completed").order_by("-created_at", "-id")[:50]
+        self.assertNotIn("TEMP B-TREE", queryset.explain())
+
+
+class MenuCacheTests(RestaurantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.public = APIClient()
+
+    def test_unchanged_menu_is_served_as_304_without_queries(self):
+        first = self.public.get("/api/menu-items/")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.data), 12)
+
+        with self.assertNumQueries(0):
+            again = self.public.get("/api/menu-items/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+        with self.assertNumQueries(0):
+            since = self.public.get("/api/menu-items/", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        self.assertEqual(since.status_code, 304)
+
+    def test_cached_menu_is_served_without_queries(self):
+        self.public.get("/api/menu-items/")
+        with self.assertNumQueries(0):
+            response = self.public.get("/api/menu-items/")
+        self.assertEqual(len(response.data), 12)
+
+    def test_menu_edit_invalidates(self):
+        etag = self.public.get("/api/menu-items/")["ETag"]
+        self.client.force_authenticate(self.manager)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/menu-items/{self.menu[0].pk}/", {"price": "9.90"}, format="json")
+
+        response = self.public.get("/api/menu-items/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["price"], "9.90")
+
+    def test_stock_change_invalidates(self):
+        etag = self.public.get("/api/menu-items/")["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submit(1, [{"menu_item": self.menu[0].pk, "quantity": 5}])
+
+        response = self.public.get("/api/menu-items/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["availability"], 45)
+
+    def test_changes_in_the_same_second_are_told_apart_by_etag(self):
+        now = timezone.now().replace(microsecond=0)
+        with mock.patch("restaurant.menu_cache.timezone.now", return_value=now):
+            first = self.public.get("/api/menu-items/")
+            menu_cache.invalidate()
+            menu_cache.invalidate()
+            second = self.public.get("/api/menu-items/")
+
+        # Last-Modified stays at the real second instead of running ahead of the clock
+        self.assertEqual(parse_http_date(second["Last-Modified"]), int(now.timestamp()))
+        self.assertNotEqual(first["ETag"], second["ETag"])
+        response = self.public.get(
+            "/api/menu-items/",
+            HTTP_IF_NONE_MATCH=first["ETag"], HTTP_IF_MODIFIED_SINCE=first["Last-Modified"],
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(SYNC_OVERLAP_SECONDS=0)
+class SyncTests(RestaurantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.submit(1, [
+            {"menu_item": self.menu[0].pk, "quantity": 2},
+            {"menu_item": self.menu[1].pk, "quantity": 1},
+        ])
+        self.order = Order.objects.get(table_number=1)
+
+    def sync(self, token=None):
+        response = self.client.get("/api/sync/", {"since": token} if token else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_snapshot_has_open_orders_and_menu(self):
+        data = self.sync()
+
+        self.assertTrue(data["full"])
+        self.assertEqual([o["id"] for o in data["orders"]], [self.order.pk])
+        self.assertEqual(len(data["order_items"]), 2)
+        self.assertEqual(len(data["menu_items"]), 12)
+
+    def test_nothing_changed(self):
+        token = self.sync()["token"]
+
+        data = self.sync(token)
+
+        self.assertFalse(data["full"])
+        self.assertEqual((data["orders"], data["order_items"], data["menu_items"]), ([], [], []))
+        self.assertEqual(data["deleted"], {"order": [], "order_item": [], "menu_item": []})
+
+    def test_filling_an_empty_order_sends_the_order(self):
+        empty = Order.objects.create(table_number=2, placed_by=self.employee, status="in_progress")
+        token = self.sync()["token"]
+
+        self.submit(2, [{"menu_item": self.menu[0].pk, "quantity": 1}])
+        data = self.sync(token)
+
+        self.assertEqual([o["id"] for o in data["orders"]], [empty.pk])
+        self.assertEqual(len(data["order_items"]), 1)
+
+    def test_amendment_sends_only_changed_rows(self):
+        token = self.sync()["token"]
+        removed_line = OrderItem.objects.get(menu_item=self.menu[1]).pk
+
+        self.submit(1, [
+            {"menu_item": self.menu[0].pk, "quantity": 3},
+            {"menu_item": self.menu[2].pk, "quantity": 1},
+        ])
+        data = self.sync(token)
+
+        self.assertEqual([o["id"] for o in data["orders"]], [self.order.pk])
+        self.assertEqual(
+            sorted((i["menu_item"], i["quantity"]) for i in data["order_items"]),
+            [(self.menu[0].pk, 3), (self.menu[2].pk, 1)],
+        )
+        self.assertEqual(
+            sorted(m["id"] for m in data["menu_items"]),
+            [self.menu[0].pk, self.menu[1].pk, self.menu[2].pk],
+        )
+        self.assertEqual(data["deleted"]["order_item"], [removed_line])
+
+    def test_completion_and_deletion_are_synced(self):
+        token = self.sync()["token"]
+
+        self.client.patch(f"/api/orders/{self.order.pk}/complete/")
+        data = self.sync(token)
+        self.assertEqual(data["orders"][0]["status"], "completed")
+
+        token = data["token"]
+        self.client.delete(f"/api/orders/{self.order.pk}/")
+        data = self.sync(token)
+        self.assertEqual(data["deleted"]["order"], [self.order.pk])
+        self.assertEqual(len(data["deleted"]["order_item"]), 2)
+
+    def test_stale_or_invalid_token(self):
+        stale = str(int((timezone.now() - timedelta(days=30)).timestamp() * 1_000_000))
+
+        self.assertTrue(self.sync(stale)["full"])
+        self.assertEqual(self.client.get("/api/sync/", {"since": "abc"}).status_code, 400)
+
+
+class LiveEventTests(RestaurantTestCase):
+
+    def test_broker_delivers_events_published_from_other_threads(self):
+        broker = events.InProcessBroker()
+
+        async def listen():
+            subscription = broker.subscribe()
+            thread = threading.Thread(target=broker.publish, args=({"type": "order.created", "order": 1},))
+            thread.start()
+            event = await subscription.get(timeout=5)
+            idle = await subscription.get(timeout=0.01)
+            subscription.close()
+            thread.join()
+            return event, idle
+
+        event, idle = async_to_sync(listen)()
+
+        self.assertEqual(event["type"], "order.created")
+        self.assertIsNone(idle)
+        self.assertEqual(broker._subscriptions, set())
+
+    def test_slow_subscriber_keeps_newest_events(self):
+        broker = events.InProcessBroker(max_queue=2)
+
+        async def listen():
+            subscription = broker.subscribe()
+            for order in range(3):
+                broker.publish({"type": "order.created", "order": order})
+            return [(await subscription.get(timeout=1))["order"] for _ in range(2)]
+
+        self.assertEqual(async_to_sync(listen)(), [1, 2])
+
+    def test_submit_and_complete_publish_after_commit(self):
+        published = []
+        with mock.patch.object(events.get_broker(), "publish", published.append):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.submit(1, [{"menu_item": self.menu[0].pk, "quantity": 1}])
+            with self.captureOnCommitCallbacks(execute=True):
+                self.submit(1, [{"menu_item": self.menu[0].pk, "quantity": 2}])
+            order = Order.objects.get()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(f"/api/orders/{order.pk}/complete/")
+
+        types = [event["type"] for event in published]
+        self.assertEqual(types, [
+            "menu.availability", "order.created",
+            "menu.availability", "order.amended",
+            "order.completed",
+        ])
+        self.assertEqual(published[3]["changes"]["updated"], [self.menu[0].pk])
+
+    def test_failed_submit_publishes_nothing(self):
+        published = []
+        with mock.patch.object(events.get_broker(), "publish", published.append):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.submit(1, [{"menu_item": self.menu[0].pk, "quantity": 500}])
+        self.assertEqual(published, [])
+
+    def test_filling_an_empty_order_is_an_amendment(self):
+        Order.objects.create(table_number=1, placed_by=self.employee, status="in_progress")
+        published = []
+        with mock.patch.object(events.get_broker(), "publish", published.append):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.submit(1, [{"menu_item": self.menu[0].pk, "quantity": 1}])
+
+        self.assertEqual([event["type"] for event in published], ["menu.availability", "order.amended"])
+        self.assertEqual(published[1]["changes"]["added"], [self.menu[0].pk])
+
+    async def test_stream_requires_token_and_sends_events(self):
+        client = AsyncClient()
+        self.assertEqual((await client.get("/api/events/")).status_code, 401)
+
+        token = str(AccessToken.for_user(self.employee))
+        response = await client.get("/api/events/", {"token": token})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+        next_chunk = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        events.get_broker().publish({"type": "order.completed", "order": 7})
+        chunk = (await asyncio.wait_for(next_chunk, 5)).decode()
+        await response.streaming_content.aclose()
+
+        self.assertIn("event: order.completed", chunk)
+        self.assertIn('"order": 7', chunk)
+
+
+class PerformanceMiddlewareTests(RestaurantTestCase):
+
+    @override_settings(PERF_SERVER_TIMING=True)
+    def test_server_timing_reports_queries(self):
+        with self.assertLogs("restaurant.performance", "INFO") as logs:
+            response = self.submit(1, [{"menu_item": self.menu[0].pk, "quantity": 1}])
+
+        self.assertRegex(response["Server-Timing"], r'db;dur=[\d.]+;desc="\d+ queries", render;dur=[\d.]+')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "OrderViewSet.submit_order")
+        self.assertGreater(record["queries"], 0)
+        self.assertEqual(record["status"], 200)
+
+    @override_settings(PERF_SERVER_TIMING=False)
+    def test_timings_stay_private_without_server_timing(self):
+        response = self.client.get("/api/menu-items/")
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    @override_settings(PERF_N_PLUS_ONE_THRESHOLD=5)
+    def test_repeated_query_shapes_are_flagged(self):
+        for table in range(8):
+            Order.objects.create(table_number=table, placed_by=self.employee, status="completed")
+        self.client.force_authenticate(self.manager)
+
+        # Rendering items per order without prefetch_related is a classic N+1
+        with mock.patch.object(CompletedOrdersView, "get_queryset", lambda view: Order.objects.filter(status="completed")):
+            with self.assertLogs("restaurant.performance", "WARNING") as logs:
+                self.client.get("/api/completed-orders/")
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertTrue(any(entry["count"] >= 8 for entry in record["n_plus_one"]))
+
+    def test_view_names(self):
+        self.assertEqual(view_name(CompletedOrdersView.as_view(), "GET"), "CompletedOrdersView")
+        self.assertEqual(view_name(OrderViewSet.as_view({"get": "list"}), "GET"), "OrderViewSet.list")
+
+    def test_in_lists_share_a_shape(self):
+        self.assertEqual(
+            sql_shape("SELECT * FROM t WHERE id IN (%s, %s, %s)"),
+            sql_shape("SELECT * FROM t WHERE id IN (%s)"),
+        )
+
+
+class SalesRollupTests(RestaurantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.manager)
+        self.menu[11].category = MenuItem.Category.DRINK
+        self.menu[11].save()
+
+    def order_and_complete(self, table, items):
+        order = self.submit(table, [{"menu_item": m.pk, "quantity": q} for m, q in items]).data
+        self.assertEqual(self.client.patch(f"/api/orders/{order['id']}/complete/").status_code, 200)
+
+    def report(self, **params):
+        response = self.client.get("/api/reports/sales/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"]
+
+    def test_completing_orders_updates_rollup(self):
+        self.order_and_complete(1, [(self.menu[0], 2), (self.menu[11], 1)])
+        self.order_and_complete(2, [(self.menu[0], 1)])
+
+        row = DailySales.objects.get(menu_item=self.menu[0])
+        self.assertEqual((row.quantity, row.revenue), (3, Decimal("15.00")))
+        self.assertEqual(self.report(group_by="category"), [
+            {"category": "DRINK", "quantity": 1, "revenue": "16.00"},
+            {"category": "MAIN", "quantity": 3, "revenue": "15.00"},
+        ])
+
+    def test_concurrent_completes_count_the_order_once(self):
+        order = self.submit(1, [{"menu_item": self.menu[0].pk, "quantity": 2}]).data
+        stale = Order.objects.get(pk=order["id"])  # What a second request read before the first committed
+        self.assertEqual(self.client.patch(f"/api/orders/{order['id']}/complete/").status_code, 200)
+
+        with mock.patch.object(OrderViewSet, "get_object", return_value=stale):
+            response = self.client.patch(f"/api/orders/{order['id']}/complete/")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(DailySales.objects.get(menu_item=self.menu[0]).quantity, 2)
+
+    def test_report_reads_only_the_rollup(self):
+        self.order_and_complete(1, [(self.menu[0], 2)])
+        with CaptureQueriesContext(connection) as ctx:
+            rows = self.report(group_by="day,item")
+        self.assertEqual(rows[0]["menu_item_name"], "Dish 0")
+        self.assertFalse(any("restaurant_order" in q["sql"] for q in ctx.captured_queries))
+
+    def test_rebuild_matches_incremental_rollup(self):
+        self.order_and_complete(1, [(self.menu[0], 2), (self.menu[1], 1)])
+        self.order_and_complete(2, [(self.menu[1], 4)])
+        incremental = sorted(DailySales.objects.values_list("date", "menu_item_id", "quantity", "revenue"))
+
+        call_command("rebuild_sales_summary", stdout=StringIO())
+
+        self.assertEqual(sorted(DailySales.objects.values_list("date", "menu_item_id", "quantity", "revenue")), incremental)
+
+    def test_report_is_managers_only_and_validates_grouping(self):
+        self.assertEqual(self.client.get("/api/reports/sales/", {"group_by": "waiter"}).status_code, 400)
+        self.client.force_authenticate(self.employee)
+        self.assertEqual(self.client.get("/api/reports/sales/").status_code, 403)
+
+
+class CompletedOrdersExportTests(RestaurantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.manager)
+        for table in range(1, 6):
+            order = self.submit(table, [
+                {"menu_item": self.menu[0].pk, "quantity": table},
+                {"menu_item": self.menu[1].pk, "quantity": 1},
+            ]).data
+            self.client.patch(f"/api/orders/{order['id']}/complete/")
+        # Still open, must not be exported
+        self.submit(9, [{"menu_item": self.menu[2].pk, "quantity": 1}])
+
+    def download(self, fmt, **params):
+        response = self.client.get(f"/api/completed-orders/export.{fmt}", params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_has_one_row_per_line(self):
+        rows = list(csv.reader(StringIO(self.download("csv"))))
+
+        self.assertEqual(rows[0][0], "order_id")
+        self.assertEqual(len(rows), 1 + 10)
+        self.assertEqual(rows[1][5:], ["Dish 0", "5.00", "1", "5.00"])
+
+    def test_ndjson_streams_in_batches(self):
+        with mock.patch.object(exports, "BATCH_SIZE", 2):
+            lines = self.download("ndjson").splitlines()
+
+        orders = [json.loads(line) for line in lines]
+        self.assertEqual([o["table_number"] for o in orders], [1, 2, 3, 4, 5])
+        self.assertEqual(orders[2]["total_price"], "21.00")
+        self.assertEqual(len(orders[2]["items"]), 2)
+
+    async def test_asgi_export_is_streamed_in_batches(self):
+        expected = await sync_to_async(self.download)("csv")
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(self.manager)}"}
+
+        with mock.patch.object(exports, "BATCH_SIZE", 2):
+            response = await self.async_client.get("/api/completed-orders/export.csv", headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)  # A sync iterator would be read into memory first
+            chunks = [chunk async for chunk in response.streaming_content]
+
+        self.assertEqual(len(chunks), 1 + 3)  # The header, then 5 orders in batches of 2
+        self.assertEqual(b"".join(chunks).decode(), expected)
+
+    def test_order_archived_between_reads_is_exported_once(self):
+        order = Order.objects.filter(status="completed").order_by("id")[2]
+        read = exports._read
+
+        def archive_after_live_read(orders, lines, last_id):
+            batch = read(orders, lines, last_id)
+            if orders.model is Order and not ArchivedOrder.objects.exists():
+                archive._archive_batch([order.pk])
+            return batch
+
+        with mock.patch.object(exports, "_read", archive_after_live_read):
+            orders = [json.loads(line) for line in self.download("ndjson").splitlines()]
+
+        self.assertEqual([o["table_number"] for o in orders], [1, 2, 3, 4, 5])
+        self.assertEqual(len(orders[2]["items"]), 2)
+
+    def test_date_range_and_permissions(self):
+        self.assertEqual(self.download("ndjson", **{"from": "2000-01-01", "to": "2000-01-31"}), "")
+        self.assertEqual(self.client.get("/api/completed-orders/export.xml").status_code, 404)
+        self.client.force_authenticate(self.employee)
+        self.assertEqual(self.client.get("/api/completed-orders/export.csv").status_code, 403)
+
+
+class ArchiveTests(RestaurantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.manager)
+        # Orders from ten days ago (even tables) interleaved with last night's (odd tables)
+        now = timezone.now()
+        for table in range(1, 9):
+            order = self.submit(table, [
+                {"menu_item": self.menu[table].pk, "quantity": 2},
+                {"menu_item": self.menu[0].pk, "quantity": 1},
+            ]).data
+            self.client.patch(f"/api/orders/{order['id']}/complete/")
+            age = timedelta(days=10, minutes=table) if table % 2 == 0 else timedelta(hours=12, minutes=table)
+            Order.objects.filter(pk=order["id"]).update(created_at=now - age)
+        self.open_order = self.submit(20, [{"menu_item": self.menu[1].pk, "quantity": 1}]).data
+        Order.objects.filter(pk=self.open_order["id"]).update(created_at=now - timedelta(days=30))
+        self.live_view = self.client.get("/api/completed-orders/").data["results"]
+
+    def archive(self, days=7, batch_size=3):
+        call_command("archive_orders", days=days, batch_size=batch_size, stdout=StringIO())
+
+    def test_moves_old_completed_orders_only(self):
+        self.archive()
+
+        self.assertEqual(sorted(Order.objects.values_list("table_number", flat=True)), [1, 3, 5, 7, 20])
+        self.assertEqual(ArchivedOrder.objects.count(), 4)
+        self.assertEqual(ArchivedOrderItem.objects.count(), 8)
+        self.assertEqual(OrderItem.objects.filter(order__table_number__in=[2, 4, 6, 8]).count(), 0)
+        archived = ArchivedOrder.objects.get(table_number=4)
+        self.assertEqual(archived.total_price, Decimal("23.00"))  # 2 x 9.00 + 5.00
+        self.assertFalse(Deletion.objects.exists())
+
+    def test_completed_orders_read_live_and_archive_as_one_list(self):
+        self.archive()
+
+        pages, url = [], "/api/completed-orders/?page_size=3"
+        while url:
+            response = self.client.get(url).data
+            pages.extend(response["results"])
+            url = response["next"]
+
+        self.assertEqual(pages, self.live_view)
+
+    def test_exports_and_rebuild_include_the_archive(self):
+        rollup = DailySales.objects.order_by("date", "menu_item_id").values_list("date", "menu_item_id", "quantity", "revenue")
+        reports.rebuild()
+        before = list(rollup)
+        self.archive()
+
+        orders = [json.loads(line) for line in self.client.get("/api/completed-orders/export.ndjson").getvalue().decode().splitlines()]
+        self.assertEqual(sorted(o["table_number"] for o in orders), list(range(1, 9)))
+        reports.rebuild()
+        self.assertEqual(list(rollup), before)
+
+
+class CachedAuthenticationTests(RestaurantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def login(self, username):
+        response = self.client.post("/api/token/", {"username": username, "password": "pass"})
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return response.data["access"]
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response.status_code, sum('"restaurant_user"' in q["sql"] for q in ctx.captured_queries)
+
+    def test_repeat_requests_skip_the_user_query(self):
+        self.login("boss")
+
+        self.assertEqual(self.user_queries("/api/menu-items/"), (200, 1))
+        self.assertEqual(self.user_queries("/api/menu-items/"), (200, 0))
+        self.assertEqual(self.user_queries("/api/users/"), (200, 1))  # The list itself
+
+    def test_changing_a_user_drops_the_cached_entry(self):
+        self.login("waiter")
+        self.client.get("/api/menu-items/")
+        admin = APIClient()
+        admin.force_authenticate(self.manager)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.patch(f"/api/users/{self.employee.pk}/", {"role": "manager"})
+        self.assertEqual(self.client.get("/api/completed-orders/").status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            admin.patch(f"/api/users/{self.employee.pk}/", {"is_active": False})
+        self.assertEqual(self.client.get("/api/menu-items/").status_code, 401)
+
+    def test_cached_user_leaves_out_the_password_and_profile(self):
+        User.objects.filter(pk=self.employee.pk).update(email="waiter@example.com")
+        self.login("waiter")
+        self.client.get("/api/menu-items/")
+
+        cached = cache.get(authentication.USER_KEY.format(self.employee.pk))
+        self.assertEqual(cached.password, "")
+        self.assertEqual((cached.username, cached.role, cached.is_active), ("waiter", "employee", True))
+        self.assertEqual(self.client.get("/api/users/me/").data["email"], "waiter@example.com")
+
+    @override_settings(AUTH_TRUST_TOKEN_CLAIMS=True)
+    def test_trusted_claims_are_ignored_without_a_shared_cache(self):
+        self.login("waiter")
+        cache.clear()
+
+        self.assertEqual(self.user_queries("/api/menu-items/"), (200, 1))
+        self.assertEqual([w.id for w in checks.trust_token_claims_check(None)], ["restaurant.W002"])
+
+    @override_settings(AUTH_TRUST_TOKEN_CLAIMS=True)
+    def test_trusted_claims_need_no_query_until_the_user_changes(self):
+        location = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location,
+        }}))
+        self.assertEqual(checks.trust_token_claims_check(None), [])
+        token = self.login("waiter")
+        cache.clear()
+
+        self.assertEqual(self.user_queries("/api/menu-items/"), (200, 0))
+        self.assertEqual(AccessToken(token)["role"], "employee")
+        self.assertEqual(self.client.get("/api/users/me/").data["username"], "waiter")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.employee.pk).update(role="manager")
+            User.objects.get(pk=self.employee.pk).save()
+        self.assertEqual(self.user_queries("/api/completed-orders/"), (200, 1))
+
+
+class IdempotentSubmitTests(RestaurantTestCase):
+
+    def submit_with_key(self, key, items, client=None):
+        return (client or self.client).post(
+            "/api/orders/submit/",
+            {"table_number": 1, "items": items},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_the_stored_response(self):
+        items = [{"menu_item": self.menu[0].pk, "quantity": 2}]
+        first = self.submit_with_key("tablet-1-42", items)
+
+        with CaptureQueriesContext(connection) as ctx:
+            retry = self.submit_with_key("tablet-1-42", items)
+
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual((retry.status_code, retry.data), (first.status_code, first.data))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(self.availability(self.menu[0]), 48)
+
+    def test_key_reused_with_another_body_is_rejected(self):
+        self.submit_with_key("tablet-1-42", [{"menu_item": self.menu[0].pk, "quantity": 2}])
+        response = self.submit_with_key("tablet-1-42", [{"menu_item": self.menu[0].pk, "quantity": 3}])
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.availability(self.menu[0]), 48)
+
+    def test_keys_are_scoped_per_user(self):
+        items = [{"menu_item": self.menu[0].pk, "quantity": 2}]
+        other = APIClient()
+        other.force_authenticate(self.manager)
+
+        self.submit_with_key("same-key", items)
+        response = self.submit_with_key("same-key", items + [{"menu_item": self.menu[1].pk, "quantity": 1}], other)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Idempotent-Replayed", response)
+
+    def test_failed_submit_is_not_replayed(self):
+        items = [{"menu_item": self.menu[0].pk, "quantity": 60}]
+        self.assertEqual(self.submit_with_key("tablet-1-42", items).status_code, 400)
+        MenuItem.objects.filter(pk=self.menu[0].pk).update(availability=100)
+
+        retry = self.submit_with_key("tablet-1-42", items)
+
+        self.assertEqual(retry.status_code, 200)
+        self.assertNotIn("Idempotent-Replayed", retry)
+        self.assertEqual(self.availability(self.menu[0]), 40)
+
+    def test_duplicate_of_a_running_request_is_told_to_retry(self):
+        with mock.patch("restaurant.idempotency.cache.add", return_value=False), \
+                mock.patch("restaurant.idempotency.cache.get", return_value={"fingerprint": mock.ANY, "status": None}):
+            response = self.submit_with_key("tablet-1-42", [{"menu_item": self.menu[0].pk, "quantity": 2}])
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertFalse(Order.objects.exists())
+
+
+class MenuBulkUpdateTests(RestaurantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.manager)
+
+    def bulk(self, items):
+        return self.client.patch("/api/menu-items/bulk/", {"items": items}, format="json")
+
+    def test_updates_many_items_in_one_statement(self):
+        items = [
+            {"id": self.menu[0].pk, "availability": 10},
+            {"id": self.menu[1].pk, "availability_delta": -5, "price": "4.50"},
+            {"id": self.menu[2].pk, "availability_delta": 3, "category": "DRINK"},
+        ]
+        with mock.patch("restaurant.menu_cache.invalidate") as invalidate, \
+                self.captureOnCommitCallbacks(execute=True), \
+                CaptureQueriesContext(connection) as ctx:
+            response = self.bulk(items)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(m["availability"], m["price"], m["category"]) for m in response.data["updated"]],
+            [(10, "5.00", "MAIN"), (45, "4.50", "MAIN"), (53, "7.00", "DRINK")],
+        )
+        self.assertEqual(sum(q["sql"].startswith("UPDATE") for q in ctx.captured_queries), 1)
+        invalidate.assert_called_once()
+
+    def test_query_count_does_not_depend_on_item_count(self):
+        def count(n):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.bulk([{"id": m.pk, "availability": 20} for m in self.menu[:n]]).status_code, 200)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(count(1), count(12))
+
+    def test_errors_are_reported_per_item_and_nothing_is_written(self):
+        response = self.bulk([
+            {"id": self.menu[0].pk, "availability": 10},
+            {"id": self.menu[1].pk, "availability_delta": -60},
+            {"id": 9999, "price": "1.00"},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.data["items"]
+        self.assertEqual(errors[0], {})
+        self.assertIn("availability_delta", errors[1])
+        self.assertIn("id", errors[2])
+        self.assertEqual(self.availability(self.menu[0]), 50)
+
+        response = self.bulk([{"id": self.menu[0].pk}, {"id": self.menu[1].pk, "availability": -1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data["items"]), 2)
+
+    def test_employees_cannot_bulk_update(self):
+        self.client.force_authenticate(self.employee)
+        self.assertEqual(self.bulk([{"id": self.menu[0].pk, "availability": 0}]).status_code, 403)
+
+
+class FastPathTests(RestaurantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        MenuItem.objects.filter(pk=self.menu[3].pk).update(name="Crème brûlée\u2028\"special\"", price=Decimal("7.5"))
+        self.submit(1, [
+            {"menu_item": self.menu[0].pk, "quantity": 2},
+            {"menu_item": self.menu[3].pk, "quantity": 1},
+        ])
+        self.submit(2, [{"menu_item": self.menu[5].pk, "quantity": 3}])
+        Order.objects.create(table_number=3, placed_by=self.manager, status="completed")
+
+    def test_orders_match_the_serializer_byte_for_byte(self):
+        queryset = OrderViewSet.queryset.order_by("id")
+
+        fast = FastJSONRenderer().render(fastpath.orders(queryset))
+        slow = JSONRenderer().render(OrderSerializer(queryset, many=True).data)
+
+        self.assertEqual(fast, slow)
+
+    def test_menu_matches_the_serializer_byte_for_byte(self):
+        queryset = MenuItem.objects.order_by("id")
+
+        fast = FastJSONRenderer().render(fastpath.menu_items(queryset))
+        slow = JSONRenderer().render(MenuItemSerializer(queryset, many=True).data)
+
+        self.assertEqual(fast, slow)
+
+    def test_renderer_matches_json_renderer(self):
+        data = {
+            "at": timezone.make_aware(datetime(2025, 8, 1, 20, 15, 30, 123456)),
+            "price": Decimal("4.50"),
+            "text": "naïve\u2029",
+            "nested": [{"n": 1, "none": None, "flag": True}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render({1: "int keys"}), JSONRenderer().render({1: "int keys"}))
+
+    def test_order_list_runs_two_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/orders/?status=all")
+        self.assertEqual(len(response.json()["results"]), 3)
+
+
+class OccupancyTests(RestaurantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        occupancy.index.invalidate()
+
+    def board(self):
+        return {row["table_number"]: row for row in self.client.get("/api/occupancy/").json()["tables"]}
+
+    def test_board_follows_submits_and_completions_without_queries(self):
+        self.board()  # Built from the (empty) open orders
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submit(4, [{"menu_item": self.menu[0].pk, "quantity": 2}])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submit(7, [{"menu_item": self.menu[1].pk, "quantity": 1}])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submit(4, [
+                {"menu_item": self.menu[0].pk, "quantity": 2},
+                {"menu_item": self.menu[2].pk, "quantity": 1},
+            ])
+
+        with self.assertNumQueries(0):
+            board = self.board()
+        self.assertEqual(sorted(board), [4, 7])
+        self.assertEqual(board[4]["items"], 3)
+        self.assertEqual(board[4]["total_price"], "17.00")  # 2 x 5.00 + 7.00
+        self.assertEqual(board[7]["total_price"], "6.00")
+
+        order = Order.objects.get(table_number=4)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/orders/{order.pk}/complete/")
+        with self.assertNumQueries(0):
+            self.assertEqual(list(self.board()), [7])
+
+    def test_board_follows_orders_created_through_the_order_list(self):
+        self.board()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/orders/", {"table_number": 3, "items": [
+                {"menu_item": self.menu[0].pk, "quantity": 2},
+                {"menu_item": self.menu[1].pk, "quantity": 1},
+            ]}, format="json")
+        self.assertEqual(response.status_code, 201)
+
+        with self.assertNumQueries(0):
+            board = self.board()
+        self.assertEqual(board[3]["order"], response.data["id"])
+        self.assertEqual(board[3]["items"], 3)
+        self.assertEqual(board[3]["total_price"], "16.00")  # 2 x 5.00 + 6.00
+
+    def test_board_reports_its_age(self):
+        response = self.client.get("/api/occupancy/").json()
+        self.assertGreaterEqual(response["age"], 0)
+        self.assertLess(response["age"], settings.OCCUPANCY_MAX_AGE)
+
+    def test_board_is_rebuilt_from_open_orders(self):
+        self.submit(2, [{"menu_item": self.menu[0].pk, "quantity": 3}])
+        Order.objects.create(table_number=9, placed_by=self.employee, status="completed")
+
+        board = self.board()
+
+        self.assertEqual(list(board), [2])
+        self.assertEqual(board[2]["order"], Order.objects.get(table_number=2).pk)
+        self.assertEqual(board[2]["items"], 3)
+        self.assertEqual(board[2]["total_price"], "15.00")
+
+    def test_board_keeps_the_price_a_line_was_ordered_at(self):
+        self.board()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submit(1, [{"menu_item": self.menu[0].pk, "quantity": 1}])
+        MenuItem.objects.filter(pk=self.menu[0].pk).update(price=Decimal("9.00"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.submit(1, [{"menu_item": self.menu[0].pk, "quantity": 2}])
+
+        self.assertEqual(self.board()[1]["total_price"], "10.00")
+        occupancy.index.invalidate()
+        self.assertEqual(self.board()[1]["total_price"], "10.00")
+
+    @override_settings(OCCUPANCY_MAX_AGE=0)
+    def test_stale_board_is_rebuilt(self):
+        self.board()
+        self.submit(5, [{"menu_item": self.menu[0].pk, "quantity": 1}])  # Commit hooks never run
+
+        self.assertEqual(list(self.board()), [5])
+
+
+class OrderListTests(RestaurantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        self.orders = {}
+        for table, (status, user, days_ago) in enumerate([
+            ("in_progress", self.employee, 0),
+            ("in_progress", self.manager, 1),
+            ("completed", self.employee, 2),
+            ("completed", self.manager, 40),
+        ], start=1):
+            order = Order.objects.create(table_number=table, placed_by=user, status=status)
+            Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(days=days_ago))
+            self.orders[table] = order.pk
+
+    def ids(self, query=""):
+        response = self.client.get(f"/api/orders/{query}")
+        self.assertEqual(response.status_code, 200, response.content)
+        return [order["id"] for order in response.json()["results"]]
+
+    def test_lists_open_orders_by_default(self):
+        self.assertEqual(self.ids(), [self.orders[1], self.orders[2]])
+
+    def test_filters(self):
+        self.assertEqual(self.ids("?status=completed"), [self.orders[3], self.orders[4]])
+        self.assertEqual(self.ids("?status=all"), [self.orders[t] for t in (1, 2, 3, 4)])
+        self.assertEqual(self.ids(f"?status=all&placed_by={self.manager.pk}"), [self.orders[2], self.orders[4]])
+        since = (timezone.localdate() - timedelta(days=10)).isoformat()
+        self.assertEqual(self.ids(f"?status=completed&from={since}"), [self.orders[3]])
+        self.assertEqual(self.client.get("/api/orders/?status=paid").status_code, 400)
+        self.assertEqual(self.client.get("/api/orders/?placed_by=boss").status_code, 400)
+        self.assertEqual(self.client.get("/api/orders/?table=abc").status_code, 400)
+
+    def test_pages_follow_the_cursor_and_cap_the_page_size(self):
+        response = self.client.get("/api/orders/?status=all&page_size=3").json()
+        self.assertEqual(len(response["results"]), 3)
+        rest = self.client.get(response["next"]).json()
+        self.assertEqual([order["id"] for order in rest["results"]], [self.orders[4]])
+        self.assertIsNone(rest["next"])
+
+        with mock.patch.object(CreatedAtCursorPagination, "max_page_size", 2):
+            self.assertEqual(len(self.ids("?status=all&page_size=1000")), 2)
+
+    def test_detail_and_complete_still_see_every_order(self):
+        self.assertEqual(self.client.get(f"/api/orders/{self.orders[3]}/").status_code, 200)
+        response = self.client.patch(f"/api/orders/{self.orders[3]}/complete/")
+        self.assertEqual(response.json(), {"error": "Order is already completed."})
+
+    async def test_async_list_matches(self):
+        sync_client = APIClient()
+        sync_client.force_authenticate(self.employee)
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(self.employee)}"}
+        for query in ("", "?status=all&page_size=3", f"?status=completed&placed_by={self.manager.pk}",
+                      "?status=paid", "?table=abc"):
+            with self.subTest(query=query):
+                expected = await sync_to_async(sync_client.get)(f"/api/orders/{query}")
+                response = await self.async_client.get(f"/api/async/orders/{query}", headers=headers)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(
+                    response.content.replace(b"/api/async/orders/", b"/api/orders/"), expected.content
+                )
+
+
+class KitchenSummaryTests(RestaurantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        MenuItem.objects.filter(pk=self.menu[11].pk).update(category=MenuItem.Category.DRINK)
+        MenuItem.objects.filter(pk=self.menu[10].pk).update(category=MenuItem.Category.APPETIZER)
+        self.submit(1, [
+            {"menu_item": self.menu[0].pk, "quantity": 2},
+            {"menu_item": self.menu[11].pk, "quantity": 3},
+        ])
+        self.submit(2, [
+            {"menu_item": self.menu[0].pk, "quantity": 1},
+            {"menu_item": self.menu[10].pk, "quantity": 1},
+            {"menu_item": self.menu[1].pk, "quantity": 4},
+        ])
+        done = self.submit(3, [{"menu_item": self.menu[0].pk, "quantity": 9}]).data["id"]
+        self.client.patch(f"/api/orders/{done}/complete/")
+
+    def test_open_quantities_grouped_by_category_in_one_query(self):
+        with self.assertNumQueries(1):
+            categories = kitchen.summary()
+
+        self.assertEqual([group["category"] for group in categories], ["APPETIZER", "MAIN", "DRINK"])
+        self.assertEqual(categories[1], {"category": "MAIN", "quantity": 7, "items": [
+            {"menu_item": self.menu[0].pk, "name": "Dish 0", "quantity": 3},
+            {"menu_item": self.menu[1].pk, "name": "Dish 1", "quantity": 4},
+        ]})
+        self.assertEqual(categories[2]["items"], [{"menu_item": self.menu[11].pk, "name": "Dish 11", "quantity": 3}])
+
+    def test_summary_is_cached_briefly(self):
+        first = self.client.get("/api/kitchen/summary/").json()
+        self.submit(4, [{"menu_item": self.menu[0].pk, "quantity": 1}])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/kitchen/summary/").json(), first)
+        with override_settings(KITCHEN_SUMMARY_CACHE_SECONDS=0):
+            self.assertEqual(self.client.get("/api/kitchen/summary/").json()["categories"][1]["quantity"], 8)
+
+
+class AsyncReadTests(RestaurantTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.submit(1, [
+            {"menu_item": self.menu[0].pk, "quantity": 2},
+            {"menu_item": self.menu[3].pk, "quantity": 1},
+        ])
+        self.submit(2, [{"menu_item": self.menu[5].pk, "quantity": 3}])
+        self.order = Order.objects.get(table_number=1)
+        self.auth = {"Authorization": f"Bearer {AccessToken.for_user(self.employee)}"}
+
+    async def test_same_responses_as_the_sync_views(self):
+        sync_client = APIClient()
+        paths = [
+            ("/api/menu-items/", "/api/async/menu-items/"),
+            ("/api/orders/", "/api/async/orders/"),
+            ("/api/orders/?table=2", "/api/async/orders/?table=2"),
+            (f"/api/orders/{self.order.pk}/", f"/api/async/orders/{self.order.pk}/"),
+            ("/api/orders/999999/", "/api/async/orders/999999/"),
+            ("/api/users/me/", "/api/async/users/me/"),
+        ]
+        for sync_path, async_path in paths:
+            for headers in (self.auth, {}, {"Authorization": "Bearer not-a-token"}):
+                with self.subTest(path=async_path, headers=headers):
+                    expected = await sync_to_async(sync_client.get)(sync_path, headers=headers)
+                    response = await self.async_client.get(async_path, headers=headers)
+                    self.assertEqual(response.status_code, expected.status_code)
+                    self.assertEqual(response.content, expected.content)
+                    self.assertEqual(response.get("WWW-Authenticate"), expected.get("WWW-Authenticate"))
+
+    async def test_menu_answers_conditional_requests(self):
+        response = await self.async_client.get("/api/async/menu-items/")
+        self.assertEqual(response.status_code, 200)
+
+        response = await self.async_client.get("/api/async/menu-items/", headers={"If-None-Match": response["ETag"]})
+
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(PERF_SERVER_TIMING=True)
+    async def test_queries_are_instrumented(self):
+        await self.async_client.get("/api/async/users/me/", headers=self.auth)  # Caches the user
+        response = await self.async_client.get("/api/async/orders/", headers=self.auth)
+
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+
+
+class ConnectionPoolCheckTests(SimpleTestCase):
+    sqlite = {"ENGINE": "django.db.backends.sqlite3", "NAME": "x"}
+    pooled = {"ENGINE": "django.db.backends.postgresql", "NAME": "x", "OPTIONS": {"pool": {"max_size": 4}}}
+
+    @override_settings(DB_POOL=True, DATABASES={"default": pooled, "replica": sqlite})
+    def test_warns_about_databases_without_a_pool(self):
+        warnings = checks.connection_pool_check(None)
+
+        self.assertEqual([w.id for w in warnings], ["restaurant.W001"])
+        self.assertIn("'replica'", warnings[0].msg)
+
+    @override_settings(DB_POOL=False, DATABASES={"default": sqlite})
+    def test_silent_without_db_pool(self):
+        self.assertEqual(checks.connection_pool_check(None), [])
+
+
+class ReplicaRouterTests(TestCase):
+
+    def test_reads_use_the_replica_until_the_request_writes(self):
+        router, state = ReplicaRouter(), db_router.RoutingState()
+        token = db_router._state.set(state)
+        try:
+            self.assertIsNone(router.db_for_read(Order))
+            state.use_replica = True
+            self.assertEqual(router.db_for_read(Order), "replica")
+            self.assertIsNone(router.db_for_write(Order))
+            self.assertIsNone(router.db_for_read(Order))
+        finally:
+            db_router._state.reset(token)
+        self.assertIsNone(router.db_for_read(Order))
+
+
+@skipUnless("replica" in settings.DATABASES, "needs a replica database (DB_REPLICA_NAME / DB_REPLICA_HOST)")
+@override_settings(DATABASE_ROUTERS=["restaurant.db_router.ReplicaRouter"])
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        self.employee = User.objects.create_user(username="waiter", password="pass")
+        self.dish = MenuItem.objects.create(name="Soup", price=Decimal("4.00"), availability=10)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.employee)}")
+
+    def queries(self, method, url, **kwargs):
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections["replica"]) as replica:
+            response = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(response.status_code, 400)
+        return len(primary.captured_queries), len(replica.captured_queries)
+
+    def test_listed_views_read_from_the_replica(self):
+        self.client.get("/api/menu-items/")  # Caches the user
+
+        primary, replica = self.queries("get", "/api/orders/")
+        self.assertEqual((primary, replica > 0), (0, True))
+        primary, replica = self.queries("get", "/api/sync/")
+        self.assertEqual((primary > 0, replica), (True, 0))
+
+    @override_settings(DB_REPLICA_PIN_SECONDS=60)
+    def test_client_reads_its_own_writes_from_the_primary(self):
+        items = [{"menu_item": self.dish.pk, "quantity": 1}]
+        primary, replica = self.queries("post", "/api/orders/submit/", data={"table_number": 1, "items": items}, format="json")
+        self.assertEqual(replica, 0)
+
+        primary, replica = self.queries("get", "/api/orders/")
+        self.assertEqual((primary > 0, replica), (True, 0))
+
+        other = User.objects.create_user(username="other", password="pass")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(other)}")
+        self.client.get("/api/menu-items/")
+        self.assertEqual(self.queries("get", "/api/orders/")[0], 0)
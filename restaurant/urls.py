@@ -1,6 +1,8 @@
-from django.urls import path
+from django.urls import path, re_path
 from rest_framework.routers import DefaultRouter
-from .views import CompletedOrdersView, UserViewSet, MenuItemViewSet, OrderViewSet
+from .streams import order_events
+from . import async_views
+from .views import CompletedOrdersView, CompletedOrdersExportView, UserViewSet, KitchenSummaryView, MenuItemViewSet, OccupancyView, OrderViewSet, SalesReportView, SyncView
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
@@ -9,4 +11,15 @@ router.register(r'orders', OrderViewSet)
 
 urlpatterns = router.urls + [
     path("completed-orders/", CompletedOrdersView.as_view(), name="completed-orders"),
+    re_path(r"^completed-orders/export\.(?P<fmt>csv|ndjson)$", CompletedOrdersExportView.as_view(), name="completed-orders-export"),
+    path("sync/", SyncView.as_view(), name="sync"),
+    path("events/", order_events, name="events"),
+    path("reports/sales/", SalesReportView.as_view(), name="sales-report"),
+    path("occupancy/", OccupancyView.as_view(), name="occupancy"),
+    path("kitchen/summary/", KitchenSummaryView.as_view(), name="kitchen-summary"),
+    # Native async reads for the ASGI server (see restaurant/async_views.py)
+    path("async/menu-items/", async_views.menu_items, name="async-menu-items"),
+    path("async/orders/", async_views.orders, name="async-orders"),
+    path("async/orders/<int:pk>/", async_views.order_detail, name="async-order-detail"),
+    path("async/users/me/", async_views.me, name="async-users-me"),
 ]
\ No newline at end of file
@@ -1,10 +1,22 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import viewsets, status, generics
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.decorators import action
-from .models import User, MenuItem, Order, OrderItem
-from .serializers import UserSerializer, MenuItemSerializer, OrderSerializer, OrderItemSerializer, CompletedOrderSerializer
+from .models import User, MenuItem, Order, ArchivedOrder
+from .serializers import UserSerializer, MenuItemSerializer, MenuBulkUpdateSerializer, OrderSerializer, OrderItemInputSerializer, CompletedOrderSerializer
 from .permissions import IsManager, ReadOnlyOrIsManager
+from .stock import InsufficientStock
+from .filters import date_range, day_range, order_filters
+from .idempotency import idempotent
+from .pagination import CreatedAtCursorPagination
+from . import events, exports, fastpath, kitchen, menu_cache, occupancy, reports, services, sync
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
@@ -16,7 +28,10 @@ class UserViewSet(viewsets.ModelViewSet):
         """
         Returns the currently authenticated user.
         """
-        serializer = self.get_serializer(request.user)
+        user = request.user
+        if getattr(user, 'is_partial', False):
+            user = User.objects.get(pk=user.pk)  # Cached or built from token claims, without the profile fields
+        serializer = self.get_serializer(user)
         return Response(serializer.data)
 
 class MenuItemViewSet(viewsets.ModelViewSet):
@@ -24,24 +39,64 @@ class MenuItemViewSet(viewsets.ModelViewSet):
     serializer_class = MenuItemSerializer
     permission_classes = [ReadOnlyOrIsManager] # Employees can read, only managers can edit
 
+    @method_decorator(condition(etag_func=menu_cache.etag, last_modified_func=menu_cache.last_modified))
+    def list(self, request, *args, **kwargs):
+        """
+        Serve the menu from the cache.
+        Clients sending If-None-Match / If-Modified-Since get a 304 without touching the database.
+        """
+        data = menu_cache.get_menu(lambda: fastpath.menu_items(self.get_queryset()))
+        return Response(data)
+
+    @action(detail=False, methods=['patch'], url_path='bulk')
+    def bulk_update(self, request):
+        """
+        Update many menu items at once (managers only), e.g. when opening:
+        {"items": [{"id": 1, "availability": 40}, {"id": 2, "availability_delta": -5, "price": "4.50"}]}
+        Each entry sets any of availability (or moves it by availability_delta), price
+        and category. Everything is written in one transaction, or nothing is when an
+        entry is invalid: errors are listed per entry, in the order they were sent.
+        """
+        serializer = MenuBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = services.update_menu(serializer.validated_data['items'])
+        updated = self.get_serializer(MenuItem.objects.filter(pk__in=ids).order_by('id'), many=True)
+        return Response({"updated": updated.data}, status=status.HTTP_200_OK)
+
 class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
-    queryset = Order.objects.all().select_related('placed_by').prefetch_related('items__menu_item')
+    queryset = Order.objects.with_totals().select_related('placed_by').prefetch_related('items')
     permission_classes = [IsAuthenticated] # Any logged-in employee/manager can create orders
 
+    pagination_class = CreatedAtCursorPagination
+
     def get_queryset(self):
-        """Optionally filter orders by table number (e.g. ?table=3)."""
-        table = self.request.query_params.get('table')
-        queryset = super().get_queryset()
-        if table:
-            queryset = queryset.filter(table_number=table)
-        return queryset
+        """
+        Filter orders by the query string (see filters.order_filters), e.g.
+        ?table=3, ?status=completed, ?placed_by=2, ?from=2025-08-01&to=2025-08-31.
+        The list shows open orders unless ?status= asks for others.
+        """
+        default_status = 'in_progress' if self.action == 'list' else None
+        return super().get_queryset().filter(**order_filters(self.request.query_params, default_status))
+
+    def list(self, request, *args, **kwargs):
+        """
+        Newest first, a page at a time ({"next", "results"}, ?page_size= up to 200).
+        Orders have the same JSON as OrderSerializer, built from .values() rows (see restaurant.fastpath).
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.paginator.paginate_queryset(queryset, request, view=self, fetch=fastpath.order_rows)
+        return self.get_paginated_response(fastpath.serialize_orders(rows))
 
     @action(detail=False, methods=['post'], url_path='submit')
+    @idempotent
     def submit_order(self, request):
         """
         Submit a new order or update an existing in-progress order for a table.
-        If updating, old items are removed and replaced with new ones.
+        If updating, only the lines that differ from the current order are written
+        and the response's "changes" lists what was added, updated or removed.
+        All items are validated and written in bulk inside one transaction.
+        Retries sending the same Idempotency-Key header get the first response back.
         """
         table_number = request.data.get('table_number')
         items_data = request.data.get('items', [])
@@ -49,30 +104,18 @@ class OrderViewSet(viewsets.ModelViewSet):
         if not table_number or not isinstance(items_data, list) or not items_data:
             return Response({"error": "table_number and items are required."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Check for existing in-progress order
-        order = Order.objects.filter(table_number=table_number, status='in_progress').first()
-
-        if not order:
-            # Create a new order
-            order = Order.objects.create(
-                table_number=table_number,
-                placed_by=request.user,
-                status='in_progress'
-            )
-        else:
-            # Replace all items (only if in progress)
-            if order.status != 'in_progress':
-                return Response({"error": "Cannot update a completed order."}, status=status.HTTP_400_BAD_REQUEST)
-            for item in order.items.all():
-                item.restore_stock_and_delete()
+        serializer = OrderItemInputSerializer(data=items_data, many=True)
+        serializer.is_valid(raise_exception=True)
 
-        # Add new items
-        for item_data in items_data:
-            serializer = OrderItemSerializer(data=item_data)
-            serializer.is_valid(raise_exception=True)
-            OrderItem.objects.create(order=order, **serializer.validated_data)
+        try:
+            order, changes = services.submit_order(table_number, serializer.validated_data, request.user)
+        except InsufficientStock as exc:
+            return Response({"error": str(exc), "items": exc.shortages}, status=status.HTTP_400_BAD_REQUEST)
+        order = self.queryset.get(pk=order.pk)
 
-        return Response(OrderSerializer(order).data, status=status.HTTP_200_OK)
+        data = OrderSerializer(order).data
+        data["changes"] = changes
+        return Response(data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['patch'], url_path='complete')
     def complete_order(self, request, pk=None):
@@ -87,15 +130,121 @@ class OrderViewSet(viewsets.ModelViewSet):
         if order.status == 'completed':
             return Response({"error": "Order is already completed."}, status=status.HTTP_400_BAD_REQUEST)
 
-        order.status = 'completed'
-        order.save(update_fields=['status'])
+        with transaction.atomic():
+            # Only the request that flips the status records the sale, even when two complete at once
+            completed = Order.objects.filter(pk=order.pk, status='in_progress').update(
+                status='completed', updated_at=timezone.now()
+            )
+            if completed:
+                order.status = 'completed'
+                reports.record_completed_order(order)
+                occupancy.order_closed_on_commit(order)
+        if not completed:
+            return Response({"error": "Order is already completed."}, status=status.HTTP_400_BAD_REQUEST)
+        events.order_changed(events.ORDER_COMPLETED, order)
 
         return Response({"message": f"Order {order.id} marked as completed."}, status=status.HTTP_200_OK)
 
 class CompletedOrdersView(generics.ListAPIView):
     serializer_class = CompletedOrderSerializer
     permission_classes = [IsManager]   # managers only
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
-        """Return all completed orders sorted by most recent first."""
-        return Order.objects.filter(status="completed").order_by("-created_at")
\ No newline at end of file
+        """
+        Return live completed orders sorted by most recent first, with totals computed in SQL.
+        Optionally limited to a date range (e.g. ?from=2025-08-01&to=2025-08-31).
+        """
+        return (
+            Order.objects.filter(status="completed", **date_range(self.request))
+            .with_totals()
+            .prefetch_related('items')
+            .order_by("-created_at", "-id")
+        )
+
+    def get_archive_queryset(self):
+        """Archived orders for the same range; they store their total."""
+        return (
+            ArchivedOrder.objects.filter(**date_range(self.request))
+            .prefetch_related('items')
+            .order_by("-created_at", "-id")
+        )
+
+    def list(self, request, *args, **kwargs):
+        """Live and archived completed orders, read as one newest-first list."""
+        page = self.paginator.paginate_querysets([self.get_queryset(), self.get_archive_queryset()], request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+class CompletedOrdersExportView(APIView):
+    """
+    Stream completed orders as CSV (one row per order line) or NDJSON (one order per line)
+    for accounting, e.g. /api/completed-orders/export.csv?from=2025-08-01&to=2025-08-31.
+    """
+    permission_classes = [IsManager]   # managers only
+
+    def get(self, request, fmt):
+        content_type = exports.FORMATS[fmt][-1]
+        # Under ASGI a sync iterator would be read whole before anything is sent
+        rows = exports.arows if isinstance(request._request, ASGIRequest) else exports.rows
+        response = StreamingHttpResponse(rows(fmt, date_range(request)), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="completed-orders.{fmt}"'
+        return response
+
+class SyncView(APIView):
+    """
+    Incremental sync for kitchen screens and waiter tablets.
+    GET /api/sync/ returns open orders, their items and the menu plus a token;
+    GET /api/sync/?since=<token> returns only what changed or was deleted since.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        token = request.query_params.get('since')
+        data = sync.changes_since(token) if token else sync.snapshot()
+        return Response(data)
+
+class OccupancyView(APIView):
+    """
+    Which tables have an open order, with its item count and running total, for the host stand.
+    Answered from a per-process in-memory index (see restaurant.occupancy), without querying the orders.
+    Orders submitted or completed through another worker process only show up once this process
+    rebuilds the index, at most OCCUPANCY_MAX_AGE seconds later; "age" is the number of seconds
+    since that last rebuild.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        tables = occupancy.index.tables()
+        age = occupancy.index.age()
+        return Response({"tables": tables, "age": None if age is None else round(age, 1)})
+
+class KitchenSummaryView(APIView):
+    """
+    What the kitchen still has to prepare: open quantities per menu item across all
+    in-progress orders, grouped by category. Cheap to poll (see restaurant.kitchen).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({"categories": kitchen.cached_summary()})
+
+class SalesReportView(APIView):
+    """
+    Revenue and quantities from the daily sales rollup (managers only).
+    e.g. /api/reports/sales/?from=2025-06-01&to=2025-08-31&group_by=category
+    group_by takes a comma separated mix of day, category and item (default: day).
+    """
+    permission_classes = [IsManager]
+
+    def get(self, request):
+        start, end = day_range(request)
+        group_by = [name for name in request.query_params.get('group_by', 'day').split(',') if name]
+        unknown = [name for name in group_by if name not in reports.GROUPINGS]
+        if unknown or not group_by:
+            return Response(
+                {"error": f"group_by must be a comma separated list of: {', '.join(reports.GROUPINGS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        rows = reports.sales_report(start, end, group_by)
+        return Response({"from": start, "to": end, "group_by": group_by, "results": rows})